@@ -1,6 +1,10 @@
 import streamlit as st
 import json
+import html
+import time
+from concurrent.futures import ThreadPoolExecutor
 from scorer import CommunicationScorer
+from bulk import BulkScoringJob, load_transcripts
 import os
 from dotenv import load_dotenv
 
@@ -83,6 +87,52 @@ if not groq_api_key:
 def load_scorer(api_key):
     return CommunicationScorer(api_key)
 
+# Background worker pool for bulk uploads (shared across sessions, like the scorer)
+@st.cache_resource
+def load_bulk_executor():
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix='bulk-scoring')
+
+poll_bulk_job = False
+
+# Highlight colours per span kind (see matcher.SPAN_KINDS)
+SPAN_COLORS = {
+    'keyword': '#c8e6c9',
+    'filler': '#ffcdd2',
+    'salutation': '#bbdefb',
+    'closing': '#e1bee7'
+}
+
+def render_highlighted_transcript(transcript, match_spans):
+    """Render the (normalized) transcript with the scorer's match spans highlighted (no re-scan of the text)"""
+    offsets = match_spans['offsets']
+    spans = sorted(
+        (offsets[i], offsets[i + 1], offsets[i + 2], offsets[i + 3]) for i in range(0, len(offsets), 4)
+    )
+    
+    parts = []
+    pos = 0
+    for start, end, kind, label in spans:
+        if start < pos:
+            continue  # overlaps a span already highlighted
+        kind_name = match_spans['kinds'][kind]
+        parts.append(html.escape(transcript[pos:start]))
+        parts.append(
+            f"<mark style='background-color: {SPAN_COLORS[kind_name]}' "
+            f"title='{kind_name}: {html.escape(match_spans['labels'][label])}'>"
+            f"{html.escape(transcript[start:end])}</mark>"
+        )
+        pos = end
+    parts.append(html.escape(transcript[pos:]))
+    
+    legend = " ".join(
+        f"<mark style='background-color: {color}'>{kind}</mark>" for kind, color in SPAN_COLORS.items()
+    )
+    st.markdown(
+        f"<div style='white-space: pre-wrap; line-height: 1.8'>{''.join(parts)}</div>"
+        f"<div style='margin-top: 0.5em; font-size: 0.85em'>{legend}</div>",
+        unsafe_allow_html=True
+    )
+
 try:
     with st.spinner("Loading AI models... (This may take a minute on first run)"):
         scorer = load_scorer(groq_api_key)
@@ -102,7 +152,7 @@ try:
     # Input methods
     input_method = st.radio(
         "Choose input method:",
-        ["Paste Text", "Upload Text File"],
+        ["Paste Text", "Upload Text File", "Bulk Upload (CSV / JSONL / ZIP)"],
         horizontal=True
     )
     
@@ -119,21 +169,86 @@ try:
         # Update session state when user types
         st.session_state.transcript = transcript
         
-    else:
+    elif input_method == "Upload Text File":
         uploaded_file = st.file_uploader("Upload transcript file", type=['txt'])
         if uploaded_file:
             transcript = uploaded_file.read().decode('utf-8')
             st.text_area("Transcript content:", value=transcript, height=200, disabled=True)
     
+    if input_method.startswith("Bulk Upload"):
+        st.caption("CSV / JSONL need a `transcript` (or `text`) column; optional `id` and `duration_seconds`. "
+                   "ZIP archives may contain `.txt` files (one transcript each) or CSV / JSONL files.")
+        bulk_file = st.file_uploader("Upload transcripts", type=['csv', 'jsonl', 'zip'])
+        
+        if st.button("🚀 Start Bulk Scoring", type="primary", use_container_width=True, disabled=bulk_file is None):
+            # Kept in the session so the warning survives the progress-polling reruns
+            st.session_state.bulk_load_errors = []
+            items = load_transcripts(bulk_file.name, bulk_file.getvalue(), st.session_state.bulk_load_errors)
+            if items:
+                st.session_state.bulk_job = BulkScoringJob(
+                    load_bulk_executor(), scorer, items, duration_seconds=duration_input
+                )
+            else:
+                st.warning("⚠️ No transcripts found in the uploaded file!")
+        
+        load_errors = st.session_state.get('bulk_load_errors')
+        if load_errors:
+            st.warning(f"⚠️ Skipped {len(load_errors)} unreadable line(s):\n\n" +
+                       "\n".join(f"- {error}" for error in load_errors[:20]))
+        
+        job = st.session_state.get('bulk_job')
+        if job is not None:
+            st.markdown("---")
+            st.header("📦 Bulk Results")
+            st.progress(job.completed / job.total, text=f"Scored {job.completed}/{job.total} transcripts")
+            
+            rows = job.summary_rows()
+            if rows:
+                st.dataframe(rows, use_container_width=True)
+            
+            cache_stats = scorer.embedding_cache.stats()
+            st.caption(f"🧠 Embedding cache: {cache_stats['hit_rate']:.0%} of transcript/sentence lookups reused "
+                       f"({cache_stats['hits']} hits, {cache_stats['misses']} misses, {cache_stats['entries']} cached sentences)")
+            feedback_stats = scorer.feedback_scheduler.stats()
+            st.caption(f"💬 AI feedback queue: {feedback_stats['queued']} waiting for rate limit, "
+                       f"{feedback_stats['sent']} sent, {feedback_stats['coalesced']} duplicates coalesced, "
+                       f"{feedback_stats['rate_limited']} rate-limit retries")
+            
+            if job.done():
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.download_button(
+                        label="⬇️ Download All Results as JSON",
+                        data=job.to_json(),
+                        file_name="bulk_scoring_results.json",
+                        mime="application/json",
+                        use_container_width=True
+                    )
+                with col2:
+                    st.download_button(
+                        label="⬇️ Download Summary as CSV",
+                        data=job.to_csv(),
+                        file_name="bulk_scoring_summary.csv",
+                        mime="text/csv",
+                        use_container_width=True
+                    )
+            else:
+                # Re-run the script shortly to refresh progress (see end of file)
+                poll_bulk_job = True
+    
     # Score button
-    if st.button("🎯 Score Transcript", type="primary", use_container_width=True):
+    elif st.button("🎯 Score Transcript", type="primary", use_container_width=True):
         if transcript and transcript.strip():
             with st.spinner("Analyzing transcript... Please wait..."):
                 # Score the transcript
-                results = scorer.score_transcript(
-                    transcript, 
-                    duration_seconds=duration_input
-                )
+                try:
+                    results = scorer.score_transcript(
+                        transcript, 
+                        duration_seconds=duration_input
+                    )
+                except ValueError as e:
+                    st.error(f"❌ {e}")
+                    st.stop()
                 
                 # Display overall score
                 st.markdown("---")
@@ -178,6 +293,17 @@ try:
                 else:
                     st.error("🔄 **Needs Work** - Significant improvements needed across multiple areas.")
                 
+                # Stages that were skipped or downgraded to stay within the time budget
+                if results.get('degraded_stages'):
+                    degraded = ", ".join(
+                        f"{d['stage']} ({d['reason']} → {d['fallback']})" for d in results['degraded_stages']
+                    )
+                    st.caption(f"⏱️ Degraded stages: {degraded}")
+                
+                # Transcript with matched keywords, fillers, salutation and closing highlighted
+                st.markdown("### 🖍️ Highlighted Transcript")
+                render_highlighted_transcript(results['normalized_transcript'], results['match_spans'])
+                
                 # AI Feedback
                 st.markdown("### 🤖 AI Analysis")
                 st.info(results['ai_feedback'])
@@ -315,4 +441,9 @@ st.markdown(
     "<div style='text-align: center; color: gray;'>Built for Nirmaan AI Intern Case Study | "
     "Powered by Groq API + Sentence Transformers</div>",
     unsafe_allow_html=True
-)
\ No newline at end of file
+)
+
+# Refresh bulk progress while background jobs are still running
+if poll_bulk_job:
+    time.sleep(1)
+    st.rerun()
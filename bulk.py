@@ -0,0 +1,191 @@
+import csv
+import io
+import json
+import os
+import zipfile
+
+# Column names accepted for the transcript text / id / duration in CSV and JSONL uploads
+TEXT_FIELDS = ['transcript', 'text']
+ID_FIELDS = ['id', 'name', 'student', 'file']
+DURATION_FIELDS = ['duration_seconds', 'duration']
+
+
+def _pick(record, fields):
+    """Return the first non-empty value among the given field names"""
+    for field in fields:
+        value = record.get(field)
+        if value not in (None, ''):
+            return value
+    return None
+
+
+def _to_item(record, default_id):
+    """Normalize a parsed CSV/JSONL record into a transcript item"""
+    record = {str(k).strip().lower(): v for k, v in record.items()}
+    transcript = _pick(record, TEXT_FIELDS)
+    if transcript is None or not str(transcript).strip():
+        return None
+
+    duration = _pick(record, DURATION_FIELDS)
+    try:
+        duration = float(duration) if duration is not None else None
+    except (TypeError, ValueError):
+        duration = None
+
+    return {
+        'id': str(_pick(record, ID_FIELDS) or default_id),
+        'transcript': str(transcript),
+        'duration_seconds': duration if duration and duration > 0 else None
+    }
+
+
+def _load_csv(text):
+    items = []
+    for i, record in enumerate(csv.DictReader(io.StringIO(text)), start=1):
+        item = _to_item(record, f"row-{i}")
+        if item:
+            items.append(item)
+    return items
+
+
+def _load_jsonl(text, errors):
+    items = []
+    for i, line in enumerate(text.splitlines(), start=1):
+        if not line.strip():
+            continue
+        # Bad lines are skipped (and reported) instead of failing the whole upload
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            errors.append(f"line {i}: invalid JSON ({e})")
+            continue
+        if isinstance(record, str):
+            record = {'transcript': record}
+        if not isinstance(record, dict):
+            errors.append(f"line {i}: expected an object or a string, got {type(record).__name__}")
+            continue
+        item = _to_item(record, f"line-{i}")
+        if item:
+            items.append(item)
+    return items
+
+
+def _load_zip(data, errors):
+    """Read every .txt file in the archive as one transcript (CSV/JSONL members are expanded)
+
+    Ids are member paths without the extension ('class-a/s1'), so same-named files in
+    different folders stay distinct.
+    """
+    items = []
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        for member in sorted(archive.namelist()):
+            if member.endswith('/') or member.startswith('__MACOSX/'):
+                continue
+            name = os.path.basename(member)
+            if name.startswith('.'):
+                continue
+            member_id, ext = os.path.splitext(member)
+            ext = ext.lower()
+            if ext == '.txt':
+                transcript = archive.read(member).decode('utf-8', errors='replace')
+                if transcript.strip():
+                    items.append({'id': member_id, 'transcript': transcript, 'duration_seconds': None})
+            elif ext in ('.csv', '.jsonl'):
+                # Prefix ids with the member path so rows from different files don't collide
+                member_errors = []
+                for item in load_transcripts(name, archive.read(member), member_errors):
+                    item['id'] = f"{member_id}/{item['id']}"
+                    items.append(item)
+                errors.extend(f"{member}: {error}" for error in member_errors)
+    return items
+
+
+def load_transcripts(filename, data, errors=None):
+    """Parse an uploaded CSV, JSONL or ZIP file into a list of transcript items
+
+    Each item is a dict with 'id', 'transcript' and 'duration_seconds' (None if not given).
+    Unparseable JSONL lines are skipped; pass a list as `errors` to collect a message per line.
+    """
+    if errors is None:
+        errors = []
+    ext = os.path.splitext(filename)[1].lower()
+    if ext == '.zip':
+        return _load_zip(data, errors)
+
+    text = data.decode('utf-8-sig', errors='replace')
+    if ext == '.csv':
+        return _load_csv(text)
+    if ext == '.jsonl':
+        return _load_jsonl(text, errors)
+    raise ValueError(f"Unsupported file type: {ext or filename}")
+
+
+class BulkScoringJob:
+    """Transcripts queued on a background executor, with progress and partial results"""
+
+    def __init__(self, executor, scorer, items, duration_seconds=None):
+        self.items = items
+        self.futures = [
+            executor.submit(self._score, scorer, item, duration_seconds)
+            for item in items
+        ]
+
+    @staticmethod
+    def _score(scorer, item, duration_seconds):
+        try:
+            results = scorer.score_transcript(
+                item['transcript'],
+                duration_seconds=item['duration_seconds'] or duration_seconds,
+                feedback_priority='batch'
+            )
+            return {'id': item['id'], 'results': results, 'error': None}
+        except Exception as e:
+            return {'id': item['id'], 'results': None, 'error': str(e)}
+
+    @property
+    def total(self):
+        return len(self.futures)
+
+    @property
+    def completed(self):
+        return sum(1 for f in self.futures if f.done())
+
+    def done(self):
+        return self.completed == self.total
+
+    def results(self):
+        """Finished results so far, in upload order"""
+        return [f.result() for f in self.futures if f.done()]
+
+    def summary_rows(self):
+        """One flat row per finished transcript (overall + per-criterion scores)"""
+        rows = []
+        for entry in self.results():
+            row = {'id': entry['id']}
+            results = entry['results']
+            if results is None:
+                row['error'] = entry['error']
+            else:
+                row['overall_score'] = results['overall_score']
+                row['words'] = results['words']
+                for criterion in results['criteria_scores']:
+                    row[criterion['criterion']] = criterion['total_score']
+                row['error'] = ''
+            rows.append(row)
+        return rows
+
+    def to_json(self):
+        return json.dumps(self.results(), indent=2)
+
+    def to_csv(self):
+        rows = self.summary_rows()
+        fieldnames = []
+        for row in rows:
+            for key in row:
+                if key not in fieldnames:
+                    fieldnames.append(key)
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+        return buffer.getvalue()
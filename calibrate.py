@@ -0,0 +1,235 @@
+"""Rubric calibration tool
+
+Extracts the raw features behind every score once (embeddings, grammar checks,
+VADER, ...) into a columnar .npz feature store, then re-applies any rubric to the
+whole store with vectorized NumPy banding and shows how the score distributions move.
+
+    # One-off: score the corpus and store its features (use the production grammar backend)
+    python calibrate.py extract golden/ --out features.npz --grammar-backend languagetool
+
+    # Try a rubric change (partial JSON on top of rubric.DEFAULT_RUBRIC)
+    python calibrate.py compare features.npz --rubric new_bands.json
+
+Example new_bands.json:
+    {"speech_rate": {"bands": [[171, null, 2, "Too Fast"], [141, 170, 6, "Fast"],
+                               [111, 140, 10, "Ideal"], [81, 110, 6, "Slow"]]}}
+"""
+import argparse
+import csv
+import sys
+
+import numpy as np
+
+from regression import load_corpus, score_corpus
+from rubric import DEFAULT_RUBRIC, band_array, load_rubric
+
+SALUTATION_TIERS = ['none', 'normal', 'good', 'excellent']
+
+FLOAT_COLUMNS = ['duration_seconds', 'wpm', 'avg_similarity', 'max_similarity', 'grammar_ratio',
+                 'ttr', 'token_ttr', 'mattr', 'mtld', 'hapax_ratio', 'filler_rate', 'vader_pos']
+INT_COLUMNS = ['word_count', 'sentence_count', 'grammar_errors']
+BOOL_COLUMNS = ['flow_has_salutation', 'flow_has_early_basics', 'flow_has_closing', 'semantic_ran']
+
+# Score columns produced by rescore(), grouped as in score_transcript
+CRITERIA = {
+    'Content & Structure': ['Salutation', 'Keyword Presence', 'Flow', 'Semantic Similarity (NLP)'],
+    'Speech Rate': ['Speech Rate'],
+    'Language & Grammar': ['Grammar', 'Vocabulary Richness'],
+    'Clarity': ['Clarity'],
+    'Engagement': ['Engagement']
+}
+
+
+def extract_features(results):
+    """Worker-side extractor for regression.score_corpus"""
+    return results['features']
+
+
+# ----- feature store -----
+
+def save_features(path, features_by_id):
+    """Write {id: features} (from score_transcript) as a columnar .npz file"""
+    ids = sorted(features_by_id)
+    rows = [features_by_id[i] for i in ids]
+    first = rows[0]
+    must_have = list(first['keyword_hits']['must_have'])
+    good_to_have = list(first['keyword_hits']['good_to_have'])
+    n_templates = next((len(r['similarities']) for r in rows if r['similarities'] is not None), 0)
+
+    columns = {
+        'ids': np.array(ids, dtype=str),
+        'salutation_tier': np.array([SALUTATION_TIERS.index(r['salutation_tier']) for r in rows], dtype=np.int8),
+        'grammar_backend': np.array([r['grammar_backend'] for r in rows], dtype=str),
+        'must_have_categories': np.array(must_have, dtype=str),
+        'good_to_have_categories': np.array(good_to_have, dtype=str),
+        'must_have_hits': np.array([[r['keyword_hits']['must_have'][c] for c in must_have] for r in rows], dtype=bool),
+        'good_to_have_hits': np.array([[r['keyword_hits']['good_to_have'][c] for c in good_to_have] for r in rows],
+                                      dtype=bool),
+        'similarities': np.array([r['similarities'] if r['similarities'] is not None else [np.nan] * n_templates
+                                  for r in rows], dtype=np.float32).reshape(len(rows), n_templates),
+    }
+    for name in FLOAT_COLUMNS:
+        columns[name] = np.array([r[name] for r in rows], dtype=np.float64)
+    for name in INT_COLUMNS:
+        columns[name] = np.array([r[name] for r in rows], dtype=np.int64)
+    for name in BOOL_COLUMNS:
+        columns[name] = np.array([r[name] for r in rows], dtype=bool)
+
+    np.savez_compressed(path, **columns)
+
+
+def load_features(path):
+    with np.load(path) as data:
+        return {name: data[name] for name in data.files}
+
+
+# ----- vectorized rubric -----
+
+def rescore(columns, rubric=None):
+    """Apply a rubric to every row of a feature store; returns {score name: array}"""
+    rubric = rubric or DEFAULT_RUBRIC
+    scores = {}
+
+    salutation_points = np.array([rubric['salutation']['points'][tier] for tier in SALUTATION_TIERS])
+    scores['Salutation'] = salutation_points[columns['salutation_tier']]
+
+    keywords = rubric['keyword_presence']
+    scores['Keyword Presence'] = np.minimum(
+        columns['must_have_hits'].sum(axis=1) * keywords['must_have_points'] +
+        columns['good_to_have_hits'].sum(axis=1) * keywords['good_to_have_points'],
+        keywords['max'])
+
+    flow = rubric['flow']
+    flow_score = (flow['max']
+                  - ~columns['flow_has_salutation'] * flow['missing_salutation_penalty']
+                  - ~columns['flow_has_early_basics'] * flow['missing_basics_penalty']
+                  - ~columns['flow_has_closing'] * flow['missing_closing_penalty'])
+    scores['Flow'] = np.where(columns['sentence_count'] < flow['min_sentences'], 0, np.maximum(flow_score, 0))
+
+    rule = rubric['semantic_similarity']
+    scores['Semantic Similarity (NLP)'] = np.where(columns['semantic_ran'], band_array(rule, columns[rule['feature']]), 0)
+
+    banded = {
+        'Speech Rate': 'speech_rate',
+        'Grammar': 'grammar',
+        'Vocabulary Richness': 'vocabulary_richness',
+        'Clarity': 'filler_words',
+        'Engagement': 'sentiment'
+    }
+    for name, criterion in banded.items():
+        rule = rubric[criterion]
+        scores[name] = band_array(rule, columns[rule['feature']])
+
+    total = 0
+    for criterion, parts in CRITERIA.items():
+        scores[criterion] = sum(scores[part] for part in parts)
+        total = total + scores[criterion]
+
+    # Same normalization as score_transcript (semantic bonus dropped from the max when skipped)
+    max_possible = np.where(columns['semantic_ran'], 110, 100)
+    scores['overall'] = np.round(total / max_possible * 100, 2)
+    return scores
+
+
+# ----- distribution diff -----
+
+def distribution_report(base, new):
+    """Text report comparing two rescore() results"""
+    lines = []
+    lines.append(f"{'score':<28}{'mean before':>12}{'mean after':>12}{'changed rows':>14}")
+    for name in list(CRITERIA) + ['overall']:
+        changed = int(np.count_nonzero(base[name] != new[name]))
+        lines.append(f"{name:<28}{base[name].mean():>12.2f}{new[name].mean():>12.2f}{changed:>14}")
+
+    lines.append("")
+    lines.append("Overall score distribution (rows per bucket)")
+    edges = np.arange(0, 101, 10)
+    before, _ = np.histogram(base['overall'], bins=edges)
+    after, _ = np.histogram(new['overall'], bins=edges)
+    for low, b, a in zip(edges[:-1], before, after):
+        label = f"{low}-{low + 10}"
+        lines.append(f"  {label:<10}{b:>10} -> {a:<10}{a - b:+d}")
+
+    for name in list(CRITERIA):
+        if np.array_equal(base[name], new[name]):
+            continue
+        lines.append("")
+        lines.append(f"{name}: rows per score")
+        values = np.union1d(base[name], new[name])
+        for value in values:
+            b = int(np.count_nonzero(base[name] == value))
+            a = int(np.count_nonzero(new[name] == value))
+            lines.append(f"  {value:>6}{b:>10} -> {a:<10}{a - b:+d}")
+    return "\n".join(lines)
+
+
+def write_scores_csv(path, ids, scores):
+    names = list(scores)
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['id'] + names)
+        for i, item_id in enumerate(ids):
+            writer.writerow([item_id] + [scores[name][i].item() for name in names])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rubric calibration from cached features")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    extract = commands.add_parser('extract', help="Score a corpus once and store its raw features")
+    extract.add_argument('corpus', help="Corpus directory or file (.txt/.csv/.jsonl/.zip)")
+    extract.add_argument('--out', required=True, help="Feature store (.npz)")
+    extract.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    extract.add_argument('--embedding-cache', default=None, help="Shared embedding cache directory (opened read-only)")
+    extract.add_argument('--grammar-backend', choices=['basic', 'languagetool'], default='basic',
+                         help="Grammar checker behind grammar_errors/grammar_ratio (match production)")
+
+    compare = commands.add_parser('compare', help="Re-apply a rubric to stored features and diff the distributions")
+    compare.add_argument('features', help="Feature store (.npz)")
+    compare.add_argument('--rubric', required=True, help="Rubric JSON to try (partial, merged onto the default)")
+    compare.add_argument('--base', default=None, help="Rubric JSON to compare against (default: current rubric)")
+    compare.add_argument('--out', default=None, help="Write the re-scored rows to this CSV")
+    args = parser.parse_args(argv)
+
+    if args.command == 'extract':
+        try:
+            items = load_corpus(args.corpus)
+        except ValueError as e:
+            print(f"✗ {e}")
+            return 1
+        print(f"Extracting features for {len(items)} transcripts...")
+        scorer_kwargs = {
+            'grammar_backend': args.grammar_backend,
+            'embedding_cache_dir': args.embedding_cache,
+            'embedding_cache_readonly': args.embedding_cache is not None,
+        }
+        features, errors = score_corpus(items, workers=args.workers, scorer_kwargs=scorer_kwargs,
+                                        extract=extract_features)
+        for item_id, error in sorted(errors.items()):
+            print(f"✗ {item_id}: {error}")
+        if not features:
+            print("No features extracted")
+            return 1
+        save_features(args.out, features)
+        print(f"✓ Wrote features for {len(features)} transcripts to {args.out}")
+        return 1 if errors else 0
+
+    columns = load_features(args.features)
+    backends = sorted(set(columns['grammar_backend'].tolist()))
+    if len(backends) > 1:
+        print(f"⚠️ Feature store mixes grammar backends ({', '.join(backends)}); "
+              f"grammar bands will be calibrated on inconsistent error counts\n")
+    elif backends:
+        print(f"Grammar features from the '{backends[0]}' backend")
+    base = rescore(columns, load_rubric(args.base) if args.base else DEFAULT_RUBRIC)
+    new = rescore(columns, load_rubric(args.rubric))
+    print(f"{len(columns['ids'])} transcripts\n")
+    print(distribution_report(base, new))
+    if args.out:
+        write_scores_csv(args.out, columns['ids'], new)
+        print(f"\n✓ Wrote re-scored rows to {args.out}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,266 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, a single writer is assumed
+    fcntl = None
+
+# Default location of the on-disk cache (shared by every process that points at it)
+DEFAULT_CACHE_DIR = os.getenv('EMBEDDING_CACHE_DIR', '.embedding_cache')
+DEFAULT_CAPACITY = 50000
+
+EMPTY_KEY = 0
+
+# How long a process that lost the writer lock waits for the writer to create the cache
+CREATE_WAIT_SECONDS = 10.0
+
+
+def normalize_sentence(sentence):
+    """Normalize a sentence for cache lookups (the model is uncased, so this keeps embeddings identical)"""
+    return re.sub(r'\s+', ' ', sentence).strip().lower()
+
+
+def sentence_key(normalized):
+    """64-bit hash of a normalized sentence (never EMPTY_KEY)"""
+    digest = hashlib.blake2b(normalized.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little') or 1
+
+
+class EmbeddingCache:
+    """Size-bounded sentence-embedding cache backed by memory-mapped .npy files
+
+    One writer process owns the cache (an fcntl lock on writer.lock) and evicts
+    least-recently-used entries once `capacity` is reached. Any number of processes
+    can open the same directory with readonly=True: they map the arrays read-only,
+    pick up new entries via refresh(), and keep their own misses in a small
+    in-process LRU instead of writing to disk. A second writer finds the lock taken
+    and opens the cache as a reader instead. Without a directory the cache lives
+    purely in memory.
+
+    Arrays are created in a temporary directory and moved into place, and an
+    existing cache is never recreated (other processes may have it mapped): opening
+    one built for another model raises ValueError, and its capacity is kept.
+    """
+
+    def __init__(self, cache_dir, dim, model_name, capacity=DEFAULT_CAPACITY, readonly=False, local_capacity=2048):
+        self.cache_dir = cache_dir
+        self.dim = dim
+        self.model_name = model_name
+        self.capacity = capacity
+        self.readonly = readonly
+        self.local_capacity = local_capacity
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._slots = OrderedDict()  # key -> slot, in LRU order (oldest first)
+        self._local = OrderedDict()  # readonly misses kept in process
+        self._keys_mtime = None
+        self._writer_lock = None
+
+        if cache_dir is None:
+            self.keys = np.zeros(capacity, dtype=np.uint64)
+            self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        else:
+            self._open()
+        self._load_slots()
+
+    # ----- on-disk layout -----
+
+    def _path(self, name):
+        return os.path.join(self.cache_dir, name)
+
+    def _read_meta(self):
+        meta_path = self._path('meta.json')
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path) as f:
+            return json.load(f)
+
+    def _acquire_writer_lock(self):
+        """Take the single-writer lock; False if another process holds it"""
+        if fcntl is None:
+            return True
+        lock_file = open(self._path('writer.lock'), 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._writer_lock = lock_file  # held for the life of the process
+        return True
+
+    def _create(self):
+        """Build empty arrays in a temp dir and move them into place (meta.json last)"""
+        tmp_dir = tempfile.mkdtemp(prefix='.tmp-', dir=self.cache_dir)
+        try:
+            keys = np.lib.format.open_memmap(
+                os.path.join(tmp_dir, 'keys.npy'), mode='w+', dtype=np.uint64, shape=(self.capacity,))
+            vectors = np.lib.format.open_memmap(
+                os.path.join(tmp_dir, 'vectors.npy'), mode='w+', dtype=np.float32, shape=(self.capacity, self.dim))
+            keys.flush()
+            vectors.flush()
+            del keys, vectors
+            with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+                json.dump({'model_name': self.model_name, 'dim': self.dim, 'capacity': self.capacity}, f)
+            for name in ('keys.npy', 'vectors.npy', 'meta.json'):
+                os.replace(os.path.join(tmp_dir, name), self._path(name))
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def _open(self):
+        if not self.readonly:
+            os.makedirs(self.cache_dir, exist_ok=True)
+        if not self.readonly and not self._acquire_writer_lock():
+            # Another process is the writer (and may still be creating the cache)
+            self.readonly = True
+            deadline = time.monotonic() + CREATE_WAIT_SECONDS
+            existing = self._read_meta()
+            while existing is None and time.monotonic() < deadline:
+                time.sleep(0.05)
+                existing = self._read_meta()
+        else:
+            existing = self._read_meta()
+
+        if existing is None:
+            if self.readonly:
+                raise FileNotFoundError(f"No embedding cache at {self.cache_dir}")
+            self._create()
+            existing = self._read_meta()
+
+        if existing['model_name'] != self.model_name or existing['dim'] != self.dim:
+            raise ValueError(f"Embedding cache at {self.cache_dir} was built for {existing['model_name']} "
+                             f"(dim {existing['dim']}); use another directory for {self.model_name}")
+        self.capacity = existing['capacity']
+
+        mode = 'r' if self.readonly else 'r+'
+        self.keys = np.load(self._path('keys.npy'), mmap_mode=mode)
+        self.vectors = np.load(self._path('vectors.npy'), mmap_mode=mode)
+        if self.readonly:
+            self._keys_mtime = os.path.getmtime(self._path('keys.npy'))
+
+    def _load_slots(self):
+        self._slots.clear()
+        for slot in np.flatnonzero(self.keys != EMPTY_KEY):
+            self._slots[int(self.keys[slot])] = int(slot)
+
+    def refresh(self):
+        """Readers: re-map the key index if the writer has flushed new entries"""
+        if not self.readonly or self.cache_dir is None:
+            return
+        mtime = os.path.getmtime(self._path('keys.npy'))
+        if mtime != self._keys_mtime:
+            with self._lock:
+                self.keys = np.load(self._path('keys.npy'), mmap_mode='r')
+                self.vectors = np.load(self._path('vectors.npy'), mmap_mode='r')
+                self._keys_mtime = mtime
+                self._load_slots()
+
+    def flush(self):
+        """Writers: persist pending entries so readers can see them"""
+        if self.readonly or self.cache_dir is None:
+            return
+        with self._lock:
+            self.vectors.flush()
+            self.keys.flush()
+
+    # ----- lookups -----
+
+    def get(self, key):
+        """Return a copy of the cached embedding for `key`, or None"""
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is not None:
+                vector = np.array(self.vectors[slot])
+                # The writer may have evicted this slot since the index was loaded
+                if int(self.keys[slot]) == key:
+                    self._slots.move_to_end(key)
+                    self.hits += 1
+                    return vector
+                del self._slots[key]
+
+            vector = self._local.get(key)
+            if vector is not None:
+                self._local.move_to_end(key)
+                self.hits += 1
+                return vector
+
+            self.misses += 1
+            return None
+
+    def put(self, key, vector):
+        """Store an embedding, evicting the least recently used entry when full"""
+        vector = np.asarray(vector, dtype=np.float32)
+        with self._lock:
+            if self.readonly:
+                self._local[key] = vector
+                if len(self._local) > self.local_capacity:
+                    self._local.popitem(last=False)
+                return
+
+            slot = self._slots.get(key)
+            if slot is None:
+                if len(self._slots) < self.capacity:
+                    slot = len(self._slots)
+                else:
+                    _, slot = self._slots.popitem(last=False)
+                    self.evictions += 1
+                # Clear the key first so readers never pair the old key with the new vector
+                self.keys[slot] = EMPTY_KEY
+            self.vectors[slot] = vector
+            self.keys[slot] = key
+            self._slots[key] = slot
+            self._slots.move_to_end(key)
+
+    def embed(self, sentences, encode):
+        """Embed sentences through the cache; `encode` is called once with all misses"""
+        self.refresh()
+        normalized = [normalize_sentence(s) for s in sentences]
+        keys = [sentence_key(s) for s in normalized]
+
+        embeddings = [self.get(key) for key in keys]
+        missing = OrderedDict()
+        for i, vector in enumerate(embeddings):
+            if vector is None:
+                missing.setdefault(keys[i], normalized[i])
+
+        if missing:
+            computed = encode(list(missing.values()))
+            for key, vector in zip(missing.keys(), computed):
+                self.put(key, vector)
+            self.flush()
+            computed = dict(zip(missing.keys(), computed))
+            embeddings = [v if v is not None else np.asarray(computed[k], dtype=np.float32)
+                          for k, v in zip(keys, embeddings)]
+
+        return np.vstack(embeddings) if embeddings else np.zeros((0, self.dim), dtype=np.float32)
+
+    # ----- metrics -----
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hit_rate, 4),
+            'evictions': self.evictions,
+            'entries': len(self._slots) + len(self._local),
+            'capacity': self.capacity,
+            'readonly': self.readonly
+        }
@@ -0,0 +1,378 @@
+"""Rate-limit-aware scheduler for LLM feedback requests
+
+Every feedback prompt goes through one FeedbackScheduler per process, which:
+- estimates each request's token cost from the prompt length (+ max_tokens for the reply)
+- holds requests until both token buckets (requests/minute, tokens/minute) can pay for them
+- serves 'interactive' requests before 'batch' ones (FIFO within a priority)
+- coalesces identical in-flight prompts into one provider call
+- backs off and retries when the provider still answers 429
+
+Callers get a concurrent.futures.Future; cancelling it while the request is still
+queued frees its slot without spending quota.
+
+Simulate against a local fake endpoint that enforces the same limits:
+
+    python feedback_scheduler.py --requests 300 --rpm 600 --tpm 60000
+    python feedback_scheduler.py --requests 300 --rpm 600 --tpm 60000 --no-scheduler
+"""
+import argparse
+import hashlib
+import heapq
+import itertools
+import math
+import random
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
+# Priority names, highest first
+PRIORITIES = ('interactive', 'batch')
+
+# Groq free-tier limits for llama-3.1-8b-instant
+DEFAULT_RPM = 30
+DEFAULT_TPM = 6000
+
+# Rough token estimate for English prompts (~4 characters per token) plus chat framing
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 8
+
+
+def estimate_tokens(text):
+    """Approximate token count of a prompt"""
+    return math.ceil(len(text) / CHARS_PER_TOKEN) + MESSAGE_OVERHEAD_TOKENS
+
+
+class RateLimitExceeded(Exception):
+    """429 from the (fake) provider; retry_after is in seconds"""
+    status_code = 429
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def is_rate_limit_error(error):
+    return getattr(error, 'status_code', None) == 429
+
+
+def retry_after_seconds(error):
+    """Retry-After hint from a 429 (RateLimitExceeded or a Groq APIStatusError), or None"""
+    if getattr(error, 'retry_after', None) is not None:
+        return float(error.retry_after)
+    headers = getattr(getattr(error, 'response', None), 'headers', None) or {}
+    try:
+        return float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Bucket of `per_minute` units refilled continuously (not thread-safe; callers lock)"""
+
+    def __init__(self, per_minute, clock=time.monotonic):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.clock = clock
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount):
+        """Seconds until `amount` can be taken (amounts above capacity wait for a full bucket)"""
+        self._refill()
+        missing = min(amount, self.capacity) - self.level
+        return missing / self.rate if missing > 0 else 0.0
+
+    def take(self, amount):
+        self._refill()
+        self.level -= min(amount, self.capacity)
+
+    def credit(self, amount):
+        """Return (or, if negative, charge) units after the real cost is known"""
+        self._refill()
+        self.level = min(self.capacity, self.level + amount)
+
+
+class _Job:
+    def __init__(self, key, prompt, max_tokens, timeout, cost):
+        self.key = key
+        self.prompt = prompt
+        self.max_tokens = max_tokens
+        self.timeout = timeout
+        self.cost = cost
+        self.priority = None
+        self.entry = None  # seq of the job's live heap entry (older entries are stale)
+        self.waiters = []
+        self.running = False
+        self.attempts = 0
+        self.not_before = 0.0
+
+
+class FeedbackScheduler:
+    """Queue in front of a feedback backend that keeps within its RPM/TPM quota
+
+    `send(prompt, max_tokens, timeout)` performs one provider call and returns
+    (text, total_tokens_used); total_tokens_used may be None when unknown.
+    """
+
+    def __init__(self, send, rpm=DEFAULT_RPM, tpm=DEFAULT_TPM, max_in_flight=4, max_retries=3,
+                 clock=time.monotonic):
+        self.send = send
+        self.clock = clock
+        self.max_retries = max_retries
+        self.requests_bucket = TokenBucket(rpm, clock)
+        self.tokens_bucket = TokenBucket(tpm, clock)
+
+        self._cond = threading.Condition()
+        self._queue = []     # heap of (priority index, seq, job)
+        self._pending = {}   # prompt key -> queued or running job
+        self._seq = itertools.count()
+        self._paused_until = 0.0
+        self._closed = False
+        self._stats = {'submitted': 0, 'coalesced': 0, 'sent': 0, 'rate_limited': 0, 'failed': 0, 'cancelled': 0}
+
+        self._workers = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix='feedback')
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, name='feedback-dispatcher', daemon=True)
+        self._dispatcher.start()
+
+    def submit(self, prompt, priority='interactive', max_tokens=200, timeout=None):
+        """Queue a prompt; returns a Future for the feedback text"""
+        if priority not in PRIORITIES:
+            raise ValueError(f"priority must be one of {PRIORITIES}")
+        rank = PRIORITIES.index(priority)
+        key = hashlib.sha256(f"{max_tokens}\0{prompt}".encode('utf-8')).digest()
+        waiter = Future()
+
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("FeedbackScheduler is closed")
+            self._stats['submitted'] += 1
+            job = self._pending.get(key)
+            if job is None:
+                job = _Job(key, prompt, max_tokens, timeout, estimate_tokens(prompt) + max_tokens)
+                self._pending[key] = job
+                self._push(job, rank)
+            else:
+                self._stats['coalesced'] += 1
+                if job.running:
+                    waiter.set_running_or_notify_cancel()
+                elif rank < job.priority:
+                    self._push(job, rank)  # an interactive duplicate promotes a queued batch request
+            job.waiters.append(waiter)
+            self._cond.notify_all()
+        return waiter
+
+    def queued(self):
+        """Requests waiting for quota (cancelled ones excluded)"""
+        with self._cond:
+            return self._queued()
+
+    def stats(self):
+        with self._cond:
+            return dict(self._stats, queued=self._queued())
+
+    def close(self):
+        """Stop dispatching; queued requests fail with RuntimeError"""
+        with self._cond:
+            self._closed = True
+            for job in list(self._pending.values()):
+                if not job.running:
+                    self._finish(job, error=RuntimeError("FeedbackScheduler closed"))
+            self._cond.notify_all()
+        self._workers.shutdown(wait=False)
+
+    # ----- internals (called with self._cond held unless noted) -----
+
+    def _queued(self):
+        return sum(1 for job in self._pending.values()
+                   if not job.running and not all(waiter.cancelled() for waiter in job.waiters))
+
+    def _push(self, job, rank):
+        job.priority = rank
+        job.entry = next(self._seq)
+        heapq.heappush(self._queue, (rank, job.entry, job))
+
+    def _finish(self, job, result=None, error=None):
+        if self._pending.get(job.key) is job:
+            del self._pending[job.key]
+        for waiter in job.waiters:
+            if not waiter.running() and not waiter.set_running_or_notify_cancel():
+                continue
+            if error is not None:
+                waiter.set_exception(error)
+            else:
+                waiter.set_result(result)
+
+    def _next_job(self):
+        """Pop the next dispatchable job, or return the seconds to wait before trying again"""
+        while self._queue:
+            _, entry, job = self._queue[0]
+            if job.entry != entry or job.running:
+                heapq.heappop(self._queue)
+                continue
+            if all(waiter.cancelled() for waiter in job.waiters):
+                heapq.heappop(self._queue)
+                self._stats['cancelled'] += 1
+                del self._pending[job.key]
+                continue
+
+            now = self.clock()
+            wait = max(self._paused_until - now, job.not_before - now,
+                       self.requests_bucket.wait_time(1), self.tokens_bucket.wait_time(job.cost))
+            if wait > 0:
+                return wait
+
+            heapq.heappop(self._queue)
+            self.requests_bucket.take(1)
+            self.tokens_bucket.take(job.cost)
+            job.waiters = [w for w in job.waiters if w.running() or w.set_running_or_notify_cancel()]
+            job.running = True
+            job.attempts += 1
+            self._stats['sent'] += 1
+            return job
+        return None
+
+    def _dispatch_loop(self):
+        with self._cond:
+            while not self._closed:
+                job = self._next_job()
+                if isinstance(job, _Job):
+                    self._workers.submit(self._run, job)
+                else:
+                    # Woken early by new submissions (a higher-priority job may have arrived)
+                    self._cond.wait(job)
+
+    def _run(self, job):
+        # Runs on a worker thread without the lock held
+        try:
+            text, used = self.send(job.prompt, job.max_tokens, job.timeout)
+        except Exception as e:
+            with self._cond:
+                if is_rate_limit_error(e) and job.attempts <= self.max_retries:
+                    # Quota drifted (other clients, estimate too low): pause everyone, then retry
+                    self._stats['rate_limited'] += 1
+                    backoff = retry_after_seconds(e) or 2.0 ** job.attempts
+                    self._paused_until = max(self._paused_until, self.clock() + backoff)
+                    job.running = False
+                    job.not_before = self.clock() + backoff
+                    self._push(job, job.priority)
+                else:
+                    self._stats['failed'] += 1
+                    self._finish(job, error=e)
+                self._cond.notify_all()
+            return
+
+        with self._cond:
+            if used is not None:
+                self.tokens_bucket.credit(job.cost - used)
+            self._finish(job, result=text)
+            self._cond.notify_all()
+
+
+# ===== LOCAL FAKE ENDPOINT =====
+
+class FakeFeedbackEndpoint:
+    """Local stand-in for the provider: enforces RPM/TPM quotas and answers 429 beyond them
+
+    Quota is charged like the provider does at admission time (estimated prompt
+    tokens + max_tokens), then the unused completion tokens are refunded.
+    """
+
+    def __init__(self, rpm, tpm, latency=0.2, clock=time.monotonic):
+        self.requests_bucket = TokenBucket(rpm, clock)
+        self.tokens_bucket = TokenBucket(tpm, clock)
+        self.latency = latency
+        self._lock = threading.Lock()
+        self.accepted = 0
+        self.rejected = 0
+        self.tokens_used = 0
+
+    def __call__(self, prompt, max_tokens, timeout=None):
+        cost = estimate_tokens(prompt) + max_tokens
+        with self._lock:
+            wait = max(self.requests_bucket.wait_time(1), self.tokens_bucket.wait_time(cost))
+            if wait > 0:
+                self.rejected += 1
+                raise RateLimitExceeded("Rate limit reached", retry_after=wait)
+            self.requests_bucket.take(1)
+            self.tokens_bucket.take(cost)
+            self.accepted += 1
+
+        time.sleep(self.latency * random.uniform(0.5, 1.5))
+        completion = random.randint(max_tokens // 2, max_tokens)
+        used = cost - max_tokens + completion
+        with self._lock:
+            self.tokens_bucket.credit(max_tokens - completion)
+            self.tokens_used += used
+        return f"Feedback for prompt {hashlib.sha1(prompt.encode('utf-8')).hexdigest()[:8]}", used
+
+
+def _simulated_prompts(n, duplicate_rate, interactive_rate):
+    prompts = []
+    for i in range(n):
+        if prompts and random.random() < duplicate_rate:
+            prompt = random.choice(prompts)[0]
+        else:
+            words = random.randint(80, 250)
+            prompt = f"Transcript {i}: " + " ".join(random.choice(['hello', 'my', 'name', 'family', 'school'])
+                                                   for _ in range(words))
+        prompts.append((prompt, 'interactive' if random.random() < interactive_rate else 'batch'))
+    return prompts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate feedback scheduling against a rate-limited fake endpoint")
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--rpm', type=int, default=600, help="Quota enforced by the fake endpoint (and scheduler)")
+    parser.add_argument('--tpm', type=int, default=60000)
+    parser.add_argument('--latency', type=float, default=0.2, help="Mean fake response time (seconds)")
+    parser.add_argument('--duplicates', type=float, default=0.1, help="Share of prompts repeating an earlier one")
+    parser.add_argument('--interactive', type=float, default=0.1, help="Share of interactive-priority requests")
+    parser.add_argument('--no-scheduler', action='store_true', help="Fire requests directly (baseline)")
+    args = parser.parse_args(argv)
+
+    endpoint = FakeFeedbackEndpoint(args.rpm, args.tpm, args.latency)
+    prompts = _simulated_prompts(args.requests, args.duplicates, args.interactive)
+    latencies = {priority: [] for priority in PRIORITIES}
+    errors = []
+    start = time.monotonic()
+
+    def record(future, priority):
+        # Completion time is taken in the callback, so early answers are not hidden behind slow ones
+        submitted = time.monotonic()
+        future.add_done_callback(
+            lambda f: errors.append(f) if f.exception() else latencies[priority].append(time.monotonic() - submitted))
+        return future
+
+    if args.no_scheduler:
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            for prompt, priority in prompts:
+                record(pool.submit(endpoint, prompt, 200), priority)
+        stats = None
+    else:
+        scheduler = FeedbackScheduler(endpoint, rpm=args.rpm, tpm=args.tpm)
+        futures = [record(scheduler.submit(prompt, priority), priority) for prompt, priority in prompts]
+        wait(futures)
+        stats = scheduler.stats()
+        scheduler.close()
+
+    elapsed = time.monotonic() - start
+    print(f"{args.requests} requests in {elapsed:.1f}s: {endpoint.accepted / elapsed * 60:.0f} calls/min, "
+          f"{endpoint.tokens_used / elapsed * 60:.0f} tokens/min "
+          f"(quota {args.rpm} RPM / {args.tpm} TPM, plus the initial full-bucket burst)")
+    print(f"Answered: {args.requests - len(errors)}   errors: {len(errors)}   429s from endpoint: {endpoint.rejected}")
+    for priority, values in latencies.items():
+        if values:
+            print(f"  {priority:<12} mean wait {sum(values) / len(values):.2f}s  max {max(values):.2f}s")
+    if stats:
+        print(f"Scheduler: {stats}")
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,130 @@
+from array import array
+from collections import deque
+
+# Kinds of highlighted spans returned by the scorer (index into this tuple)
+SPAN_KINDS = ('keyword', 'filler', 'salutation', 'closing')
+
+# Sentence terminators used by the rubric (same as re.split(r'[.!?]+', ...))
+TERMINATORS = '.!?'
+
+
+class PhraseMatcher:
+    """Aho-Corasick automaton that finds every occurrence of a fixed phrase list in one scan
+
+    Matches have plain substring semantics (overlaps included), i.e. exactly the
+    occurrences that `phrase in text` checks would see.
+    """
+
+    def __init__(self, phrases):
+        self.phrases = list(phrases)
+        self.lengths = [len(p) for p in self.phrases]
+
+        goto = [{}]
+        fail = [0]
+        out = [()]
+        for pid, phrase in enumerate(self.phrases):
+            node = 0
+            for ch in phrase:
+                nxt = goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[node][ch] = nxt
+                    goto.append({})
+                    fail.append(0)
+                    out.append(())
+                node = nxt
+            out[node] = out[node] + (pid,)
+
+        # Breadth-first failure links; outputs of the fallback state are inherited
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in goto[node].items():
+                queue.append(nxt)
+                f = fail[node]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                out[nxt] = out[nxt] + out[fail[nxt]]
+
+        self._goto = goto
+        self._fail = fail
+        self._out = out
+
+    def scan(self, text, source=None):
+        """Scan lower-cased text once, collecting phrase matches and sentence bounds
+
+        `source` is the same text before lower-casing (same length); defaults to `text`.
+        """
+        goto, fail, out, lengths = self._goto, self._fail, self._out, self.lengths
+        matches = array('i')
+        sentences = array('i')
+        first_period = -1
+
+        node = 0
+        seg_start = 0
+        has_content = False
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for pid in out[node]:
+                matches.extend((i + 1 - lengths[pid], i + 1, pid))
+
+            if ch in TERMINATORS:
+                if has_content:
+                    sentences.extend((seg_start, i))
+                seg_start = i + 1
+                has_content = False
+                if ch == '.' and first_period < 0:
+                    first_period = i
+            elif not has_content and not ch.isspace():
+                has_content = True
+
+        if has_content:
+            sentences.extend((seg_start, len(text)))
+
+        return TextScan(text, matches, sentences, first_period, source)
+
+
+class TextScan:
+    """Result of one PhraseMatcher pass over a transcript
+
+    This is the shared token stream for the scorers: `source` (normalized text),
+    `text` (its lower-cased form, same offsets) and `words` (lower-cased tokens).
+    All offset data is stored in flat int arrays:
+    - matches:    (start, end, phrase_id) triples, in order of match end
+    - sentences:  (start, end) pairs of non-empty sentences split on . ! ?
+    - highlights: (start, end, kind, label) quadruples recorded by the scorers
+    """
+
+    def __init__(self, text, matches, sentences, first_period, source=None):
+        self.text = text
+        self.source = text if source is None else source
+        self.words = text.split()
+        self.matches = matches
+        self.sentences = sentences
+        self.first_period = first_period
+        self.highlights = array('i')
+
+    @property
+    def sentence_count(self):
+        return len(self.sentences) // 2
+
+    def sentence_bounds(self, index):
+        """(start, end) of the index-th non-empty sentence (negative indexes allowed)"""
+        index %= self.sentence_count
+        return self.sentences[2 * index], self.sentences[2 * index + 1]
+
+    def sentence_texts(self):
+        """Non-empty sentences of the source text, stripped"""
+        s = self.sentences
+        return [self.source[s[i]:s[i + 1]].strip() for i in range(0, len(s), 2)]
+
+    def iter_matches(self):
+        m = self.matches
+        for i in range(0, len(m), 3):
+            yield m[i], m[i + 1], m[i + 2]
+
+    def mark(self, start, end, kind, label):
+        self.highlights.extend((start, end, kind, label))
@@ -0,0 +1,155 @@
+import hashlib
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+
+# Hinglish / transliterated fillers: canonical spelling -> common ASR spellings.
+# The canonical forms are added to the scorer's filler list.
+TRANSLITERATED_FILLERS = {
+    'matlab': ['matlab', 'mtlb'],
+    'yaani': ['yaani', 'yani', 'yaane'],
+    'achha': ['achha', 'acha', 'accha', 'achcha', 'achchha'],
+    'haan': ['haan', 'haanji', 'haan ji'],
+}
+
+# Punctuation folded to ASCII after NFKC (quotes, dashes, invisible characters)
+_CHAR_MAP = str.maketrans({
+    '\u2018': "'", '\u2019': "'", '\u02bc': "'", '\u00b4': "'", '`': "'",
+    '\u201c': '"', '\u201d': '"',
+    '\u2013': '-', '\u2014': '-',
+    '\u200b': '', '\u200c': '', '\u200d': '', '\ufeff': '',
+})
+
+# ASR disfluency markup
+_FILLER_TAG = re.compile(r'[\[(<{]\s*(u+m+|u+h+|h+m+|a+h+|e+r+m*)\s*[\])>}]', re.IGNORECASE)
+_STRETCHED_FILLERS = [
+    (re.compile(r'\bu+m+\b', re.IGNORECASE), 'um'),
+    (re.compile(r'\bu+h+\b', re.IGNORECASE), 'uh'),
+    (re.compile(r'\bh+m+\b', re.IGNORECASE), 'hmm'),
+    (re.compile(r'\ba+h+\b', re.IGNORECASE), 'ah'),
+    # "er" alone is too ambiguous (the ER ward); only err / erm and longer stretches
+    (re.compile(r'\be+r+m+\b', re.IGNORECASE), 'um'),
+    (re.compile(r'\be+rr+\b', re.IGNORECASE), 'uh'),
+]
+# Event tags: known events in any bracket style, or a single short token in [], <> or {}
+# ([SPEAKER_1], <unk>). Bracketed text with spaces ("< 50 in maths but >") is kept.
+_EVENT_WORDS = (r'laugh\w*|cough\w*|noise|background noise|inaudible|unintelligible|crosstalk|silence|pause|'
+                r'breath\w*|sigh\w*|music|applause|unk')
+_EVENT_TAG = re.compile(r'\s*(?:[\[(<{]\s*(?:' + _EVENT_WORDS + r')\s*[\])>}]'
+                        r'|\[[\w:.-]{1,24}\]|<[\w:.-]{1,24}>|\{[\w:.-]{1,24}\})', re.IGNORECASE)
+_FRAGMENT = re.compile(r"\b(\w+)-\s+(?=\1)", re.IGNORECASE)
+
+# Contractions split by ASR ("I 'm", "do n't", "it ' s")
+_SPLIT_NT = re.compile(r"\b(\w+)\s+n't\b", re.IGNORECASE)
+_SPLIT_CONTRACTION = re.compile(r"\b(\w+)\s*'\s+(m|s|re|ve|ll|d|t)\b|\b(\w+)\s+'(m|s|re|ve|ll|d|t)\b", re.IGNORECASE)
+
+_TRANSLITERATED = [
+    (re.compile(r'\b' + re.escape(variant) + r'\b', re.IGNORECASE), canonical)
+    for canonical, variants in TRANSLITERATED_FILLERS.items()
+    for variant in sorted(variants, key=len, reverse=True)
+    if variant != canonical
+]
+
+
+def _at_sentence_start(text, index):
+    i = index - 1
+    while i >= 0 and text[i].isspace():
+        i -= 1
+    return i < 0 or text[i] in '.!?'
+
+
+def _standalone(text, end):
+    """The word ending at `end` is followed by a comma or ends its sentence"""
+    i = end
+    while i < len(text) and text[i].isspace():
+        i += 1
+    return i == len(text) or text[i] in ',.!?'
+
+
+def _replace_keeping_case(pattern, canonical, text, standalone_only=False):
+    """Substitute `canonical` for lower-case matches, and for capitalized ones only at a sentence start
+
+    Capitalized words elsewhere and all-caps words ("ER") are left alone. With
+    standalone_only, a capitalized match must also be followed by a comma or the end
+    of its sentence ("Acha, I ..." is a filler; "Acha is my friend." is a name).
+    """
+    def replace(m):
+        word = m.group(0)
+        if word.islower():
+            return canonical
+        if (word[0].isupper() and (len(word) == 1 or word[1:].islower()) and _at_sentence_start(text, m.start())
+                and (not standalone_only or _standalone(text, m.end()))):
+            return canonical.capitalize()
+        return word
+    return pattern.sub(replace, text)
+
+
+def _drop_event_tag(m):
+    """Remove a tag, leaving a space only where it separated two words ('Hello[noise]world')"""
+    text, end = m.string, m.end()
+    if m.start() == 0 or end == len(text) or text[end].isspace() or text[end] in ',.!?;:':
+        return ''
+    return ' '
+
+
+def normalize_unicode(text):
+    """NFKC-normalize and fold typographic quotes, dashes and zero-width characters"""
+    return unicodedata.normalize('NFKC', text).translate(_CHAR_MAP)
+
+
+def strip_asr_markup(text):
+    """Keep tagged fillers ([um] -> um), drop event tags ([inaudible], (laughs)) and word fragments"""
+    text = _FILLER_TAG.sub(r'\1', text)
+    for pattern, canonical in _STRETCHED_FILLERS:
+        text = _replace_keeping_case(pattern, canonical, text)
+    text = _EVENT_TAG.sub(_drop_event_tag, text)
+    return _FRAGMENT.sub('', text)
+
+
+def join_contractions(text):
+    """Re-join contractions split by ASR tokenization"""
+    text = _SPLIT_NT.sub(r"\1n't", text)
+    return _SPLIT_CONTRACTION.sub(lambda m: f"{m.group(1) or m.group(3)}'{m.group(2) or m.group(4)}", text)
+
+
+def canonicalize_transliterated_fillers(text):
+    """Map spelling variants of Hinglish fillers to one canonical form"""
+    for pattern, canonical in _TRANSLITERATED:
+        text = _replace_keeping_case(pattern, canonical, text, standalone_only=True)
+    return text
+
+
+DEFAULT_STEPS = [normalize_unicode, strip_asr_markup, join_contractions, canonicalize_transliterated_fillers]
+
+
+class TextNormalizer:
+    """Pre-scoring normalization pipeline, cached per input hash
+
+    Steps are plain str -> str callables applied in order; pass your own list to
+    plug in extra steps (or an empty list to disable normalization).
+    """
+
+    def __init__(self, steps=None, cache_size=4096):
+        self.steps = list(DEFAULT_STEPS if steps is None else steps)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def normalize(self, text):
+        key = hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return cached
+
+        normalized = text
+        for step in self.steps:
+            normalized = step(normalized)
+
+        with self._lock:
+            self._cache[key] = normalized
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return normalized
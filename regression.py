@@ -0,0 +1,225 @@
+"""Golden-corpus regression runner
+
+Scores a stored corpus of transcripts with a deterministic scorer and diffs the
+results against saved baselines, with a per-criterion tolerance.
+
+    # Record baselines
+    python regression.py golden/ --baseline golden_baseline.jsonl --update
+
+    # Check the current engine against them
+    python regression.py golden/ --baseline golden_baseline.jsonl --tolerance "Content & Structure=1"
+
+The corpus is a directory of .txt / .csv / .jsonl / .zip files (any format the bulk
+upload accepts). Exits with status 1 when any transcript drifts beyond tolerance.
+"""
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from bulk import load_transcripts
+
+# Default allowed absolute difference per score key (overall is a 0-100 float)
+DEFAULT_TOLERANCES = {'overall': 0.01}
+DEFAULT_CRITERION_TOLERANCE = 0
+
+
+def check_unique_ids(items):
+    """Raise ValueError if two items share an id (baselines and feature stores are keyed by id)"""
+    seen, duplicates = set(), set()
+    for item in items:
+        if item['id'] in seen:
+            duplicates.add(item['id'])
+        seen.add(item['id'])
+    if duplicates:
+        shown = ', '.join(sorted(duplicates)[:10])
+        raise ValueError(f"{len(duplicates)} duplicate transcript id(s): {shown} "
+                         f"(give every row a unique 'id' column)")
+
+
+def load_corpus(path):
+    """Load transcript items from a corpus directory or a single corpus file (ids must be unique)"""
+    if os.path.isfile(path):
+        with open(path, 'rb') as f:
+            items = load_transcripts(path, f.read())
+        check_unique_ids(items)
+        return items
+
+    items = []
+    for root, _, files in os.walk(path):
+        for name in sorted(files):
+            file_path = os.path.join(root, name)
+            rel_id = os.path.splitext(os.path.relpath(file_path, path))[0]
+            ext = os.path.splitext(name)[1].lower()
+            with open(file_path, 'rb') as f:
+                data = f.read()
+            if ext == '.txt':
+                transcript = data.decode('utf-8', errors='replace')
+                if transcript.strip():
+                    items.append({'id': rel_id, 'transcript': transcript, 'duration_seconds': None})
+            elif ext in ('.csv', '.jsonl', '.zip'):
+                for item in load_transcripts(name, data):
+                    item['id'] = f"{rel_id}/{item['id']}"
+                    items.append(item)
+    check_unique_ids(items)
+    return items
+
+
+def extract_scores(results):
+    """Flatten a score_transcript result into {key: score} for diffing"""
+    scores = {'overall': results['overall_score']}
+    for criterion in results['criteria_scores']:
+        scores[criterion['criterion']] = criterion['total_score']
+        for sub in criterion.get('subcriteria', []):
+            scores[f"{criterion['criterion']} / {sub['name']}"] = sub['score']
+    return scores
+
+
+def diff_scores(baseline, current, tolerances=None):
+    """Compare two {key: score} dicts; returns [(key, baseline, current)] beyond tolerance"""
+    tolerances = {**DEFAULT_TOLERANCES, **(tolerances or {})}
+    drifts = []
+    for key in sorted(set(baseline) | set(current)):
+        old, new = baseline.get(key), current.get(key)
+        if old is None or new is None:
+            drifts.append((key, old, new))
+            continue
+        # Sub-criteria fall back to their parent criterion's tolerance
+        tolerance = tolerances.get(key, tolerances.get(key.split(' / ')[0], DEFAULT_CRITERION_TOLERANCE))
+        if abs(new - old) > tolerance:
+            drifts.append((key, old, new))
+    return drifts
+
+
+# ----- parallel scoring (one deterministic scorer per worker process) -----
+
+_worker_scorer = None
+
+
+def _init_worker(scorer_kwargs):
+    # AI feedback is not scored, so workers use the canned message (no feedback cache writers).
+    # Workers never write a shared embedding cache: in-memory unless a (read-only) one is given.
+    global _worker_scorer
+    from scorer import CommunicationScorer
+    scorer_kwargs = {'embedding_cache_dir': None, **scorer_kwargs}
+    _worker_scorer = CommunicationScorer(os.getenv('GROQ_API_KEY', ''), deterministic=True, **scorer_kwargs)
+
+
+def _score_item(extract, item):
+    try:
+        results = _worker_scorer.score_transcript(item['transcript'], duration_seconds=item['duration_seconds'])
+        return item['id'], extract(results), None
+    except Exception as e:
+        return item['id'], None, str(e)
+
+
+def score_corpus(items, workers=None, scorer_kwargs=None, extract=extract_scores):
+    """Score corpus items in parallel; returns ({id: extract(results)}, {id: error})
+
+    `extract` must be a module-level function (it is sent to the worker processes).
+    """
+    check_unique_ids(items)
+    scores, errors = {}, {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(scorer_kwargs or {},)) as executor:
+        for item_id, item_scores, error in executor.map(partial(_score_item, extract), items, chunksize=16):
+            if error is None:
+                scores[item_id] = item_scores
+            else:
+                errors[item_id] = error
+    return scores, errors
+
+
+def load_baseline(path):
+    baseline = {}
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                baseline[record['id']] = record['scores']
+    return baseline
+
+
+def save_baseline(path, scores):
+    with open(path, 'w') as f:
+        for item_id in sorted(scores):
+            f.write(json.dumps({'id': item_id, 'scores': scores[item_id]}) + '\n')
+
+
+def parse_tolerances(values):
+    tolerances = {}
+    for value in values or []:
+        key, _, amount = value.rpartition('=')
+        if not key:
+            raise argparse.ArgumentTypeError(f"Tolerance must look like KEY=VALUE, got {value!r}")
+        tolerances[key.strip()] = float(amount)
+    return tolerances
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Golden-corpus regression runner for CommunicationScorer")
+    parser.add_argument('corpus', help="Corpus directory or file (.txt/.csv/.jsonl/.zip)")
+    parser.add_argument('--baseline', required=True, help="Baseline JSONL file")
+    parser.add_argument('--update', action='store_true', help="Write the current scores as the new baseline")
+    parser.add_argument('--tolerance', action='append', metavar='KEY=VALUE',
+                        help="Allowed absolute difference, e.g. 'overall=0.5' or 'Clarity=3' (repeatable)")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--grammar-backend', choices=['basic', 'languagetool'], default='basic')
+    parser.add_argument('--embedding-cache', default=None, help="Shared embedding cache directory (opened read-only)")
+    parser.add_argument('--semantic-pooling', choices=['text', 'sentences'], default='text',
+                        help="Transcript embedding used for semantic similarity")
+    args = parser.parse_args(argv)
+
+    try:
+        items = load_corpus(args.corpus)
+    except ValueError as e:
+        print(f"✗ {e}")
+        return 1
+    print(f"Scoring {len(items)} transcripts...")
+
+    scorer_kwargs = {
+        'grammar_backend': args.grammar_backend,
+        'semantic_pooling': args.semantic_pooling,
+        'embedding_cache_dir': args.embedding_cache,
+        'embedding_cache_readonly': args.embedding_cache is not None,
+    }
+    scores, errors = score_corpus(items, workers=args.workers, scorer_kwargs=scorer_kwargs)
+    for item_id, error in sorted(errors.items()):
+        print(f"✗ {item_id}: {error}")
+
+    if args.update:
+        save_baseline(args.baseline, scores)
+        print(f"✓ Wrote {len(scores)} baselines to {args.baseline}")
+        return 1 if errors else 0
+
+    baseline = load_baseline(args.baseline)
+    tolerances = parse_tolerances(args.tolerance)
+
+    passed = regressions = 0
+    for item_id in sorted(set(baseline) | set(scores)):
+        if item_id in errors:
+            continue
+        if item_id not in scores:
+            print(f"✗ {item_id}: missing from corpus")
+            regressions += 1
+            continue
+        if item_id not in baseline:
+            print(f"? {item_id}: no baseline (run with --update)")
+            continue
+        drifts = diff_scores(baseline[item_id], scores[item_id], tolerances)
+        if drifts:
+            regressions += 1
+            print(f"✗ {item_id}")
+            for key, old, new in drifts:
+                print(f"    {key}: {old} -> {new}")
+        else:
+            passed += 1
+
+    print(f"{passed} passed, {regressions} drifted, {len(errors)} errors")
+    return 1 if regressions or errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
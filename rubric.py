@@ -0,0 +1,113 @@
+"""Scoring rubric as data
+
+The same rubric drives CommunicationScorer (one transcript at a time) and the
+vectorized re-scoring in calibrate.py (a whole feature store at once), so band
+changes can be tried on cached features without re-running any models.
+
+Bands are [low, high, points, label] rows checked in order; a value matches when
+low <= value <= high (None means unbounded). The first matching row wins, and
+'default' = [points, label] applies when none match.
+"""
+import copy
+import json
+
+import numpy as np
+
+DEFAULT_RUBRIC = {
+    'salutation': {
+        'points': {'excellent': 5, 'good': 4, 'normal': 2, 'none': 0}
+    },
+    'keyword_presence': {
+        'must_have_points': 4,
+        'good_to_have_points': 2,
+        'max': 30
+    },
+    'flow': {
+        'min_sentences': 3,
+        'max': 5,
+        'missing_salutation_penalty': 1,
+        'missing_basics_penalty': 2,
+        'missing_closing_penalty': 1
+    },
+    'semantic_similarity': {
+        'feature': 'avg_similarity',
+        'bands': [
+            [0.7, None, 10, "Excellent semantic match"],
+            [0.6, None, 8, "Good semantic alignment"],
+            [0.5, None, 6, "Moderate semantic match"],
+            [0.4, None, 4, "Fair semantic alignment"]
+        ],
+        'default': [2, "Weak semantic match"]
+    },
+    'speech_rate': {
+        'feature': 'wpm',
+        'bands': [
+            [161, None, 2, "Too Fast"],
+            [141, 160, 6, "Fast"],
+            [111, 140, 10, "Ideal"],
+            [81, 110, 6, "Slow"]
+        ],
+        'default': [2, "Too Slow"]
+    },
+    'grammar': {
+        'feature': 'grammar_ratio',
+        'bands': [[0.9, None, 10, None], [0.7, None, 8, None], [0.5, None, 6, None], [0.3, None, 4, None]],
+        'default': [2, None]
+    },
+    'vocabulary_richness': {
+        'feature': 'ttr',
+        'bands': [[0.9, None, 10, None], [0.7, None, 8, None], [0.5, None, 6, None], [0.3, None, 4, None]],
+        'default': [2, None]
+    },
+    'filler_words': {
+        'feature': 'filler_rate',
+        'bands': [[None, 3, 15, None], [None, 6, 12, None], [None, 9, 9, None], [None, 12, 6, None]],
+        'default': [3, None]
+    },
+    'sentiment': {
+        'feature': 'vader_pos',
+        'bands': [[0.9, None, 15, None], [0.7, None, 12, None], [0.5, None, 9, None], [0.3, None, 6, None]],
+        'default': [3, None]
+    }
+}
+
+# Criteria that are plain bands over one feature
+BANDED_CRITERIA = ['semantic_similarity', 'speech_rate', 'grammar', 'vocabulary_richness', 'filler_words', 'sentiment']
+
+
+def band(rule, value):
+    """Points and label for one value"""
+    for low, high, points, label in rule['bands']:
+        if (low is None or value >= low) and (high is None or value <= high):
+            return points, label
+    return tuple(rule['default'])
+
+
+def band_array(rule, values):
+    """Vectorized band(): points for an array of values"""
+    values = np.asarray(values, dtype=float)
+    conditions = []
+    for low, high, _, _ in rule['bands']:
+        condition = np.ones(values.shape, dtype=bool)
+        if low is not None:
+            condition &= values >= low
+        if high is not None:
+            condition &= values <= high
+        conditions.append(condition)
+    return np.select(conditions, [row[2] for row in rule['bands']], default=rule['default'][0])
+
+
+def merge_rubric(overrides, base=None):
+    """Rubric with per-criterion overrides applied (criterion keys replace the base's keys)"""
+    rubric = copy.deepcopy(base or DEFAULT_RUBRIC)
+    for criterion, settings in (overrides or {}).items():
+        if criterion not in rubric:
+            raise KeyError(f"Unknown rubric criterion: {criterion}")
+        rubric[criterion].update(settings)
+    return rubric
+
+
+def load_rubric(path):
+    """Load a (partial) rubric JSON file on top of the default rubric"""
+    with open(path) as f:
+        return merge_rubric(json.load(f))
@@ -5,26 +5,117 @@ from sklearn.metrics.pairwise import cosine_similarity
 import re
 from groq import Groq
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+from embedding_cache import EmbeddingCache, DEFAULT_CACHE_DIR
+from feedback_scheduler import FeedbackScheduler, DEFAULT_RPM, DEFAULT_TPM
+from matcher import PhraseMatcher, SPAN_KINDS
+from normalizer import TextNormalizer, TRANSLITERATED_FILLERS
+from rubric import DEFAULT_RUBRIC, band
+from vocabulary import vocabulary_stats
 import os
+import json
+import time
+import hashlib
+import threading
 import warnings
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as StageTimeout
 
 # Suppress torch warnings
 warnings.filterwarnings('ignore', category=UserWarning, module='torch')
 os.environ['TOKENIZERS_PARALLELISM'] = 'false'
 
+# Overall time budget for one score_transcript call (seconds)
+DEFAULT_DEADLINE_SECONDS = 20.0
+
+# Per-stage time budgets for the optional (slow / external) stages (seconds).
+# When a stage overruns its budget or the overall deadline, it is skipped or
+# downgraded and recorded under 'degraded_stages' in the result.
+DEFAULT_STAGE_BUDGETS = {
+    'semantic_similarity': 5.0,
+    'grammar': 8.0,
+    'ai_feedback': 10.0,
+}
+
+# Worker threads per optional stage. Each stage has its own pool, so a hung call
+# only ties up threads of that stage; once this many of its timed-out calls are
+# still running, the stage stops taking new work until one of them returns.
+STAGE_WORKERS = {
+    'semantic_similarity': 2,
+    'grammar': 2,
+}
+
+# Grammar backends: 'auto' prefers LanguageTool and falls back to the basic check
+GRAMMAR_BACKENDS = ('auto', 'languagetool', 'basic')
+
+# Ideal self-introduction characteristics that transcripts are compared against
+IDEAL_TEMPLATES = [
+    "I introduce myself with my name, age, and educational background",
+    "I talk about my family members and relationships",
+    "I share my hobbies, interests, and activities I enjoy",
+    "I mention my goals, dreams, and aspirations for the future",
+    "I provide unique or interesting facts about myself"
+]
+
+# Transcript embedding for semantic similarity: 'text' encodes the whole transcript
+# (what the semantic bands were tuned on); 'sentences' is the word-count-weighted mean
+# of cached sentence embeddings (more cache hits, no truncation of long transcripts)
+SEMANTIC_POOLING = ('text', 'sentences')
+
+FEEDBACK_MODEL = "llama-3.1-8b-instant"
+FEEDBACK_MAX_TOKENS = 200
+
 class CommunicationScorer:
-    def __init__(self, groq_api_key):
-        """Initialize the scorer with models"""
+    def __init__(self, groq_api_key, deadline_seconds=DEFAULT_DEADLINE_SECONDS, stage_budgets=None,
+                 embedding_cache_dir=DEFAULT_CACHE_DIR, embedding_cache_readonly=False,
+                 deterministic=False, grammar_backend='auto', feedback_cache_path=None, normalizer=None,
+                 rubric=None, feedback_rpm=DEFAULT_RPM, feedback_tpm=DEFAULT_TPM, semantic_pooling='text'):
+        """Initialize the scorer with models
+        
+        deterministic=True makes scores reproducible: the grammar backend is pinned
+        ('auto' becomes 'basic'), stages never degrade on time budgets, and AI feedback
+        comes from feedback_cache_path (misses call Groq at temperature 0) or the canned message.
+        
+        normalizer is the pre-scoring normalization stage (default: TextNormalizer()).
+        rubric holds the score bands and points (default: rubric.DEFAULT_RUBRIC).
+        feedback_rpm / feedback_tpm are the Groq quota the feedback scheduler keeps within
+        (per process; split the account quota across worker processes).
+        semantic_pooling picks how the transcript is embedded (see SEMANTIC_POOLING).
+        """
         from groq import Groq
         import shutil
         
+        if grammar_backend not in GRAMMAR_BACKENDS:
+            raise ValueError(f"grammar_backend must be one of {GRAMMAR_BACKENDS}")
+        if semantic_pooling not in SEMANTIC_POOLING:
+            raise ValueError(f"semantic_pooling must be one of {SEMANTIC_POOLING}")
+        self.semantic_pooling = semantic_pooling
+        if deterministic and grammar_backend == 'auto':
+            grammar_backend = 'basic'
+        self.deterministic = deterministic
+        self.grammar_backend = grammar_backend
+        
         # Initialize Groq client
-        self.groq_client = Groq(api_key=groq_api_key)
+        # No SDK-level retries: the feedback scheduler owns retries, so every attempt is charged to its buckets
+        self.groq_client = Groq(api_key=groq_api_key, max_retries=0)
+        self.feedback_scheduler = FeedbackScheduler(self.send_feedback_prompt, rpm=feedback_rpm, tpm=feedback_tpm)
         
         # Load sentence transformer model for semantic similarity
         print("Loading models...")
         self.semantic_model = SentenceTransformer('all-MiniLM-L6-v2')
         
+        # Sentence-embedding cache (memory-mapped, shareable read-only across processes)
+        embedding_dim = self.semantic_model.get_sentence_embedding_dimension()
+        try:
+            self.embedding_cache = EmbeddingCache(embedding_cache_dir, embedding_dim, 'all-MiniLM-L6-v2',
+                                                  readonly=embedding_cache_readonly)
+            print(f"✓ Embedding cache ready ({embedding_cache_dir or 'in-memory'})")
+        except Exception as e:
+            print(f"⚠️ Could not open embedding cache: {str(e)}, using in-memory cache")
+            self.embedding_cache = EmbeddingCache(None, embedding_dim, 'all-MiniLM-L6-v2')
+        
+        # Templates are fixed, so they are embedded once here rather than looked up in the
+        # cache per transcript (that would inflate its hit rate with guaranteed hits)
+        self.template_embeddings = self.semantic_model.encode(IDEAL_TEMPLATES, convert_to_tensor=False)
+        
         # Initialize VADER for sentiment analysis
         from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
         self.sentiment_analyzer = SentimentIntensityAnalyzer()
@@ -33,9 +124,11 @@ class CommunicationScorer:
         self.grammar_tool = None
         try:
             # Try to find Java automatically
-            java_path = shutil.which('java')
+            java_path = shutil.which('java') if grammar_backend != 'basic' else None
             
-            if java_path:
+            if grammar_backend == 'basic':
+                print("✓ Using basic grammar checking (pinned)")
+            elif java_path:
                 java_home = os.path.dirname(os.path.dirname(java_path))
                 os.environ['JAVA_HOME'] = java_home
                 print(f"✓ Found Java at: {java_path}")
@@ -52,6 +145,16 @@ class CommunicationScorer:
             print("✓ Using basic grammar checking instead")
             self.grammar_tool = None
         
+        if grammar_backend == 'languagetool' and self.grammar_tool is None:
+            raise RuntimeError("grammar_backend='languagetool' was requested but LanguageTool is unavailable")
+        
+        # Deterministic mode: AI feedback cached by prompt hash
+        self.feedback_cache_path = feedback_cache_path
+        self.feedback_cache = None
+        self._feedback_cache_lock = threading.Lock()
+        if feedback_cache_path:
+            self.feedback_cache = self.load_feedback_cache(feedback_cache_path)
+        
         print("✓ All models loaded successfully!")
         
         # Define filler words
@@ -59,7 +162,60 @@ class CommunicationScorer:
             'um', 'uh', 'like', 'you know', 'so', 'actually', 
             'basically', 'right', 'i mean', 'well', 'kinda', 
             'sort of', 'okay', 'hmm', 'ah'
-        ]
+        ] + list(TRANSLITERATED_FILLERS)
+        
+        # Score bands / points
+        self.rubric = rubric or DEFAULT_RUBRIC
+        
+        # Normalization stage (Unicode, ASR markup, contractions, Hinglish fillers)
+        self.normalizer = normalizer if normalizer is not None else TextNormalizer()
+        
+        # Salutation tiers, checked in order (first sentence only)
+        self.salutation_phrases = {
+            'excellent': ['i am excited to introduce', 'feeling great', 'thrilled', 'delighted'],
+            'good': ['good morning', 'good afternoon', 'good evening', 'good day', 'hello everyone'],
+            'normal': ['hi', 'hello']
+        }
+        
+        # Must Have keywords (4 points each, max 20)
+        self.must_have_keywords = {
+            'name': ['name', 'myself', 'i am', "i'm"],
+            'age': ['years old', 'age', 'year old'],
+            'school/class': ['school', 'class', 'grade', 'studying'],
+            'family': ['family', 'mother', 'father', 'parents', 'siblings', 'brother', 'sister'],
+            'hobbies/interest': ['hobby', 'hobbies', 'like', 'enjoy', 'love', 'interest', 'play', 'playing']
+        }
+        
+        # Good to Have keywords (2 points each, max 10)
+        self.good_to_have_keywords = {
+            'about_family': ['kind', 'caring', 'loving', 'supportive', 'special thing about'],
+            'location': ['from', 'live in', 'based in', 'located'],
+            'ambition': ['want to', 'dream', 'goal', 'aspire', 'future', 'become'],
+            'unique_fact': ['fun fact', 'interesting', 'unique', 'special'],
+            'strengths': ['good at', 'strength', 'achievement', 'award', 'excel']
+        }
+        
+        # Flow markers
+        self.flow_salutations = ['hello', 'hi', 'good morning', 'good afternoon', 'good evening']
+        self.flow_basics = ['name', 'myself', 'age', 'class', 'school']
+        self.closing_words = ['thank', 'thanks', 'goodbye']
+        
+        self._build_phrase_matcher()
+        
+        # Time budgets for the optional stages of score_transcript
+        self.deadline_seconds = deadline_seconds
+        self.stage_budgets = dict(DEFAULT_STAGE_BUDGETS)
+        if stage_budgets:
+            self.stage_budgets.update(stage_budgets)
+        
+        # Worker threads for optional stages, one pool per stage. A hung call (e.g.
+        # LanguageTool) keeps its thread busy but cannot starve the other stages.
+        self.stage_executors = {
+            name: ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f'scorer-{name}')
+            for name, workers in STAGE_WORKERS.items()
+        }
+        self._stuck_stage_calls = {name: set() for name in STAGE_WORKERS}
+        self._stuck_lock = threading.Lock()
     
     def count_words(self, text):
         """Count words in transcript"""
@@ -70,185 +226,239 @@ class CommunicationScorer:
         sentences = re.split(r'[.!?]+', text)
         return len([s for s in sentences if s.strip()])
     
+    def _build_phrase_matcher(self):
+        """Compile every rubric phrase into one automaton so a transcript is scanned once"""
+        roles = {}
+        
+        def add(phrases, role, label):
+            for phrase in phrases:
+                roles.setdefault(phrase, []).append((role, label))
+        
+        for tier, phrases in self.salutation_phrases.items():
+            add(phrases, 'salutation', tier)
+        for category, keywords in self.must_have_keywords.items():
+            add(keywords, 'must_have', category)
+        for category, keywords in self.good_to_have_keywords.items():
+            add(keywords, 'good_to_have', category)
+        for filler in self.filler_words:
+            add([filler], 'filler', filler)
+        add(self.flow_salutations, 'flow_salutation', None)
+        add(self.flow_basics, 'flow_basics', None)
+        for word in self.closing_words:
+            add([word], 'closing', word)
+        
+        self.phrase_matcher = PhraseMatcher(roles.keys())
+        self.phrase_roles = [roles[phrase] for phrase in self.phrase_matcher.phrases]
+        
+        # Label table for highlight spans
+        self.span_labels = list(self.salutation_phrases) + list(self.must_have_keywords) + \
+            list(self.good_to_have_keywords) + self.filler_words + self.closing_words
+        self.span_label_index = {label: i for i, label in enumerate(self.span_labels)}
+    
+    def scan_text(self, text):
+        """Normalize the transcript, then make a single pass collecting tokens, phrase matches and sentence bounds"""
+        normalized = self.normalizer.normalize(text)
+        text_lower = normalized.lower()
+        if len(text_lower) != len(normalized):
+            # Keep offsets aligned with the normalized text (a few characters lower-case to two)
+            text_lower = ''.join(ch.lower()[0] for ch in normalized)
+        return self.phrase_matcher.scan(text_lower, source=normalized)
+    
+    def _role_matches(self, scan, role):
+        """(start, end, label) of every match of phrases with the given role"""
+        for start, end, pid in scan.iter_matches():
+            for match_role, label in self.phrase_roles[pid]:
+                if match_role == role:
+                    yield start, end, label
+    
+    def _mark(self, scan, start, end, kind, label):
+        scan.mark(start, end, SPAN_KINDS.index(kind), self.span_label_index[label])
+    
+    def export_spans(self, scan):
+        """Compact highlight spans: flat offsets (start, end, kind, label) indexing the tables"""
+        return {
+            'kinds': list(SPAN_KINDS),
+            'labels': self.span_labels,
+            'offsets': scan.highlights.tolist()
+        }
+    
     # ===== SEMANTIC SIMILARITY SCORING =====
     
-    def score_semantic_similarity(self, text):
-        """Score semantic similarity to ideal self-introduction (0-10 bonus points)"""
-        # Define ideal self-introduction characteristics
-        ideal_templates = [
-            "I introduce myself with my name, age, and educational background",
-            "I talk about my family members and relationships",
-            "I share my hobbies, interests, and activities I enjoy",
-            "I mention my goals, dreams, and aspirations for the future",
-            "I provide unique or interesting facts about myself"
-        ]
-        
-        # Get embeddings
-        transcript_embedding = self.semantic_model.encode(text, convert_to_tensor=False)
-        template_embeddings = self.semantic_model.encode(ideal_templates, convert_to_tensor=False)
+    def embed_sentences(self, sentences):
+        """Embed sentences, serving repeated ones from the embedding cache"""
+        return self.embedding_cache.embed(
+            sentences,
+            lambda batch: self.semantic_model.encode(batch, convert_to_tensor=False)
+        )
+    
+    def semantic_similarities(self, text, scan=None):
+        """Cosine similarity of the transcript to each ideal self-introduction template"""
+        # Transcript embedding through the cache (repeated transcripts / sentences are encoded once)
+        if self.semantic_pooling == 'sentences':
+            if scan is not None:
+                sentences = scan.sentence_texts() or [scan.source]
+            else:
+                sentences = [s.strip() for s in re.split(r'[.!?]+', text) if s.strip()] or [text]
+            sentence_embeddings = self.embed_sentences(sentences)
+            weights = [len(s.split()) or 1 for s in sentences]
+            transcript_embedding = np.average(sentence_embeddings, axis=0, weights=weights)
+        else:
+            transcript_embedding = self.embed_sentences([text])[0]
         
         # Calculate cosine similarity with each template
-        similarities = cosine_similarity([transcript_embedding], template_embeddings)[0]
-        
+        return cosine_similarity([transcript_embedding], self.template_embeddings)[0]
+    
+    def band_semantic_similarity(self, similarities):
+        """Convert template similarities to points (0-10 bonus)"""
         # Average similarity score - Convert to Python float
         avg_similarity = float(np.mean(similarities))
         max_similarity = float(np.max(similarities))
         
-        # Convert to points (0-10 scale)
         # High semantic match = more points
-        if avg_similarity >= 0.7:
-            score = 10
-            feedback = "Excellent semantic match"
-        elif avg_similarity >= 0.6:
-            score = 8
-            feedback = "Good semantic alignment"
-        elif avg_similarity >= 0.5:
-            score = 6
-            feedback = "Moderate semantic match"
-        elif avg_similarity >= 0.4:
-            score = 4
-            feedback = "Fair semantic alignment"
-        else:
-            score = 2
-            feedback = "Weak semantic match"
-        
+        score, feedback = band(self.rubric['semantic_similarity'], avg_similarity)
         detailed_feedback = f"{feedback} (avg: {avg_similarity:.3f}, max: {max_similarity:.3f})"
         
         return score, detailed_feedback, avg_similarity, max_similarity
     
+    def score_semantic_similarity(self, text, scan=None):
+        """Score semantic similarity to ideal self-introduction (0-10 bonus points)"""
+        return self.band_semantic_similarity(self.semantic_similarities(text, scan))
+    
     # ===== CONTENT & STRUCTURE SCORING =====
     
-    def score_salutation(self, text):
+    def salutation_tier(self, scan):
+        """Best salutation tier in the first sentence ('excellent', 'good', 'normal' or 'none')"""
+        # Only the first sentence (up to the first '.') counts
+        first_sentence_end = scan.first_period if scan.first_period >= 0 else len(scan.text)
+        tiers_found = set()
+        for start, end, tier in self._role_matches(scan, 'salutation'):
+            if end <= first_sentence_end:
+                tiers_found.add(tier)
+                self._mark(scan, start, end, 'salutation', tier)
+        
+        for tier in self.salutation_phrases:
+            if tier in tiers_found:
+                return tier
+        return 'none'
+    
+    def score_salutation(self, text, scan=None):
         """Score salutation level (0-5 points)"""
-        text_lower = text.lower().strip()
-        first_sentence = text_lower.split('.')[0]
-        
-        # Excellent (5 points)
-        excellent_phrases = ['i am excited to introduce', 'feeling great', 'thrilled', 'delighted']
-        for phrase in excellent_phrases:
-            if phrase in first_sentence:
-                return 5, "Excellent salutation"
-        
-        # Good (4 points)
-        good_greetings = ['good morning', 'good afternoon', 'good evening', 'good day', 'hello everyone']
-        for greeting in good_greetings:
-            if greeting in first_sentence:
-                return 4, "Good salutation"
-        
-        # Normal (2 points)
-        normal_greetings = ['hi', 'hello']
-        for greeting in normal_greetings:
-            if greeting in first_sentence:
-                return 2, "Normal salutation"
-        
-        # No salutation (0 points)
-        return 0, "No salutation found"
-    
-    def score_keyword_presence(self, text):
+        if scan is None:
+            scan = self.scan_text(text)
+        return self.band_salutation(self.salutation_tier(scan))
+    
+    def band_salutation(self, tier):
+        """Points and feedback for a salutation tier"""
+        score = self.rubric['salutation']['points'][tier]
+        if tier == 'none':
+            return score, "No salutation found"
+        return score, f"{tier.capitalize()} salutation"
+    
+    def score_keyword_presence(self, text, scan=None):
         """Score keyword presence (0-30 points)"""
-        text_lower = text.lower()
+        if scan is None:
+            scan = self.scan_text(text)
         score = 0
         found_keywords = []
         missing_keywords = []
         
-        # Must Have keywords (4 points each, max 20)
-        must_have = {
-            'name': ['name', 'myself', 'i am', "i'm"],
-            'age': ['years old', 'age', 'year old'],
-            'school/class': ['school', 'class', 'grade', 'studying'],
-            'family': ['family', 'mother', 'father', 'parents', 'siblings', 'brother', 'sister'],
-            'hobbies/interest': ['hobby', 'hobbies', 'like', 'enjoy', 'love', 'interest', 'play', 'playing']
-        }
+        present = set()
+        for role in ('must_have', 'good_to_have'):
+            for start, end, category in self._role_matches(scan, role):
+                present.add(category)
+                self._mark(scan, start, end, 'keyword', category)
         
-        for category, keywords in must_have.items():
-            if any(kw in text_lower for kw in keywords):
-                score += 4
+        points = self.rubric['keyword_presence']
+        for category in self.must_have_keywords:
+            if category in present:
+                score += points['must_have_points']
                 found_keywords.append(category)
             else:
                 missing_keywords.append(category)
         
-        # Good to Have keywords (2 points each, max 10)
-        good_to_have = {
-            'about_family': ['kind', 'caring', 'loving', 'supportive', 'special thing about'],
-            'location': ['from', 'live in', 'based in', 'located'],
-            'ambition': ['want to', 'dream', 'goal', 'aspire', 'future', 'become'],
-            'unique_fact': ['fun fact', 'interesting', 'unique', 'special'],
-            'strengths': ['good at', 'strength', 'achievement', 'award', 'excel']
-        }
-        
-        for category, keywords in good_to_have.items():
-            if any(kw in text_lower for kw in keywords):
-                score += 2
+        for category in self.good_to_have_keywords:
+            if category in present:
+                score += points['good_to_have_points']
                 found_keywords.append(category)
         
         feedback = f"Found: {', '.join(found_keywords)}"
         if missing_keywords:
             feedback += f" | Missing: {', '.join(missing_keywords)}"
         
-        return min(score, 30), feedback, found_keywords
+        return min(score, points['max']), feedback, found_keywords
+    
+    def flow_markers(self, scan, mark=True):
+        """(has_salutation, has_early_basics, has_closing) for the flow check"""
+        if scan.sentence_count == 0:
+            return False, False, False
+        
+        first_start, first_end = scan.sentence_bounds(0)
+        early_end = scan.sentence_bounds(min(2, scan.sentence_count - 1))[1]
+        last_start, last_end = scan.sentence_bounds(-1)
+        
+        has_salutation = False
+        has_early_basics = False
+        has_closing = False
+        for start, end, pid in scan.iter_matches():
+            for role, label in self.phrase_roles[pid]:
+                # Check if salutation is at the beginning
+                if role == 'flow_salutation' and first_start <= start and end <= first_end:
+                    has_salutation = True
+                # Check if basic details come early (first 3 sentences)
+                elif role == 'flow_basics' and end <= early_end:
+                    has_early_basics = True
+                # Check for closing
+                elif role == 'closing' and last_start <= start and end <= last_end:
+                    has_closing = True
+                    if mark:
+                        self._mark(scan, start, end, 'closing', label)
+        
+        return has_salutation, has_early_basics, has_closing
     
-    def score_flow(self, text):
+    def score_flow(self, text, scan=None):
         """Score flow/structure (0-5 points)"""
-        text_lower = text.lower()
-        sentences = [s.strip() for s in re.split(r'[.!?]+', text) if s.strip()]
+        if scan is None:
+            scan = self.scan_text(text)
+        evaluated = scan.sentence_count >= self.rubric['flow']['min_sentences']
+        return self.band_flow(scan.sentence_count, self.flow_markers(scan, mark=evaluated))
+    
+    def band_flow(self, sentence_count, markers):
+        """Points and feedback from the flow markers"""
+        rules = self.rubric['flow']
         
-        if len(sentences) < 3:
+        if sentence_count < rules['min_sentences']:
             return 0, "Too short to evaluate flow"
         
-        score = 5  # Start with full score
+        score = rules['max']  # Start with full score
         feedback = []
         
-        # Check if salutation is at the beginning
-        first_sentence = sentences[0].lower()
-        has_salutation = any(word in first_sentence for word in ['hello', 'hi', 'good morning', 'good afternoon', 'good evening'])
-        
-        # Check if basic details come early (first 3 sentences)
-        early_text = ' '.join(sentences[:3]).lower()
-        has_early_basics = any(word in early_text for word in ['name', 'myself', 'age', 'class', 'school'])
-        
-        # Check for closing
-        last_sentence = sentences[-1].lower()
-        has_closing = any(word in last_sentence for word in ['thank', 'thanks', 'goodbye'])
+        has_salutation, has_early_basics, has_closing = markers
         
         if not has_salutation:
-            score -= 1
+            score -= rules['missing_salutation_penalty']
             feedback.append("Missing salutation")
         
         if not has_early_basics:
-            score -= 2
+            score -= rules['missing_basics_penalty']
             feedback.append("Basic details not introduced early")
         
         if not has_closing:
-            score -= 1
+            score -= rules['missing_closing_penalty']
             feedback.append("No closing statement")
         
-        if score == 5:
+        if not feedback:
             feedback = ["Good flow maintained"]
         
         return max(score, 0), "; ".join(feedback)
     
     # ===== SPEECH RATE SCORING =====
     
-    def score_speech_rate(self, text, duration_seconds):
+    def score_speech_rate(self, text, duration_seconds, scan=None):
         """Score speech rate (0-10 points)"""
-        word_count = self.count_words(text)
+        word_count = len(scan.words) if scan is not None else self.count_words(text)
         wpm = (word_count / duration_seconds) * 60
         
-        if wpm > 161:
-            score = 2
-            category = "Too Fast"
-        elif 141 <= wpm <= 160:
-            score = 6
-            category = "Fast"
-        elif 111 <= wpm <= 140:
-            score = 10
-            category = "Ideal"
-        elif 81 <= wpm <= 110:
-            score = 6
-            category = "Slow"
-        else:  # < 80
-            score = 2
-            category = "Too Slow"
+        score, category = band(self.rubric['speech_rate'], wpm)
         
         return score, f"{category} ({wpm:.1f} WPM)"
     
@@ -256,32 +466,37 @@ class CommunicationScorer:
     
     def score_grammar(self, text):
         """Score grammar (0-10 points)"""
-        word_count = self.count_words(text)
+        # Pinned backends never switch methods
+        if self.grammar_backend == 'languagetool':
+            return self.score_grammar_language_tool(text)
         
         # If LanguageTool is available, use it
-        if self.grammar_tool is not None:
+        if self.grammar_backend == 'auto' and self.grammar_tool is not None:
             try:
-                matches = self.grammar_tool.check(text)
-                errors_per_100_words = (len(matches) / word_count) * 100
-                grammar_score_ratio = 1 - min(errors_per_100_words / 10, 1)
-                
-                if grammar_score_ratio >= 0.9:
-                    score = 10
-                elif grammar_score_ratio >= 0.7:
-                    score = 8
-                elif grammar_score_ratio >= 0.5:
-                    score = 6
-                elif grammar_score_ratio >= 0.3:
-                    score = 4
-                else:
-                    score = 2
-                
-                return score, f"{len(matches)} errors ({errors_per_100_words:.1f} per 100 words)", grammar_score_ratio
+                return self.score_grammar_language_tool(text)
             except Exception as e:
                 print(f"LanguageTool error: {e}, falling back to basic checks")
         
-        # Basic grammar checking (fallback)
-        sentences = [s.strip() for s in re.split(r'[.!?]+', text) if s.strip()]
+        return self.score_grammar_basic(text)
+    
+    def band_grammar(self, errors, word_count):
+        """Convert an error count to (points, errors per 100 words, grammar ratio)"""
+        errors_per_100_words = (errors / word_count) * 100
+        grammar_score_ratio = max(0, 1 - min(errors_per_100_words / 10, 1))
+        
+        score, _ = band(self.rubric['grammar'], grammar_score_ratio)
+        return score, errors_per_100_words, grammar_score_ratio
+    
+    def count_grammar_errors(self, text):
+        """Number of LanguageTool matches (raises if the check fails)"""
+        return len(self.grammar_tool.check(text))
+    
+    def count_basic_grammar_issues(self, text, scan=None):
+        """Basic rule-based issue count: lower-case sentence starts and double spaces"""
+        if scan is not None:
+            sentences = scan.sentence_texts()
+        else:
+            sentences = [s.strip() for s in re.split(r'[.!?]+', text) if s.strip()]
         issues = 0
         
         # Check for basic issues
@@ -292,70 +507,70 @@ class CommunicationScorer:
             if '  ' in sentence:
                 issues += 1
         
-        errors_per_100_words = (issues / word_count) * 100
-        grammar_score_ratio = max(0, 1 - (errors_per_100_words / 10))
-        
-        if grammar_score_ratio >= 0.9:
-            score = 10
-        elif grammar_score_ratio >= 0.7:
-            score = 8
-        elif grammar_score_ratio >= 0.5:
-            score = 6
-        elif grammar_score_ratio >= 0.3:
-            score = 4
-        else:
-            score = 2
-        
+        return issues
+    
+    def score_grammar_language_tool(self, text):
+        """Score grammar with LanguageTool (raises if the check fails)"""
+        errors = self.count_grammar_errors(text)
+        score, errors_per_100_words, grammar_score_ratio = self.band_grammar(errors, self.count_words(text))
+        return score, f"{errors} errors ({errors_per_100_words:.1f} per 100 words)", grammar_score_ratio
+    
+    def score_grammar_basic(self, text, scan=None):
+        """Basic rule-based grammar check (fallback when LanguageTool is unavailable)"""
+        word_count = len(scan.words) if scan is not None else self.count_words(text)
+        issues = self.count_basic_grammar_issues(text, scan)
+        score, _, grammar_score_ratio = self.band_grammar(issues, word_count)
         return score, f"Basic check: {issues} issues found", grammar_score_ratio
     
-    def score_vocabulary_richness(self, text):
+    def vocabulary_features(self, text, scan=None):
+        """Plain TTR plus length-robust MATTR, MTLD and hapax ratio (see vocabulary.py)"""
+        words = scan.words if scan is not None else text.lower().split()
+        stats = vocabulary_stats(scan.text if scan is not None else text)
+        return {
+            # Plain whitespace-token TTR, kept as the default rubric feature for backward compatibility
+            'ttr': len(set(words)) / len(words) if words else 0,
+            # Same ratio over punctuation-stripped Unicode tokens ("family." == "family")
+            'token_ttr': stats['ttr'],
+            'mattr': stats['mattr'],
+            'mtld': stats['mtld'],
+            'hapax_ratio': stats['hapax_ratio']
+        }
+    
+    def band_vocabulary(self, vocab):
+        """Points and feedback for vocabulary_features(); the rubric picks which measure is banded"""
+        rule = self.rubric['vocabulary_richness']
+        score, _ = band(rule, vocab[rule['feature']])
+        feedback = f"TTR: {vocab['ttr']:.2f} (MATTR: {vocab['mattr']:.2f}, MTLD: {vocab['mtld']:.1f})"
+        return score, feedback
+    
+    def score_vocabulary_richness(self, text, scan=None):
         """Score vocabulary richness using TTR (0-10 points)"""
-        words = text.lower().split()
-        unique_words = set(words)
-        
-        ttr = len(unique_words) / len(words) if words else 0
-        
-        if ttr >= 0.9:
-            score = 10
-        elif ttr >= 0.7:
-            score = 8
-        elif ttr >= 0.5:
-            score = 6
-        elif ttr >= 0.3:
-            score = 4
-        else:
-            score = 2
-        
-        return score, f"TTR: {ttr:.2f}", ttr
+        vocab = self.vocabulary_features(text, scan)
+        score, feedback = self.band_vocabulary(vocab)
+        return score, feedback, vocab['ttr']
     
     # ===== CLARITY SCORING =====
     
-    def score_filler_words(self, text):
+    def score_filler_words(self, text, scan=None):
         """Score filler word rate (0-15 points)"""
-        text_lower = text.lower()
-        total_words = self.count_words(text)
+        if scan is None:
+            scan = self.scan_text(text)
+        text_lower = scan.text
+        total_words = len(scan.words)
         
-        filler_count = 0
-        found_fillers = []
+        # A filler counts when it stands alone: preceded by a space, followed by a space, comma or period
+        counts = {}
+        for start, end, filler in self._role_matches(scan, 'filler'):
+            if start > 0 and text_lower[start - 1] == ' ' and end < len(text_lower) and text_lower[end] in ' ,.':
+                counts[filler] = counts.get(filler, 0) + 1
+                self._mark(scan, start, end, 'filler', filler)
         
-        for filler in self.filler_words:
-            count = text_lower.count(f' {filler} ') + text_lower.count(f' {filler},') + text_lower.count(f' {filler}.')
-            if count > 0:
-                filler_count += count
-                found_fillers.append(f"{filler}({count})")
+        filler_count = sum(counts.values())
+        found_fillers = [f"{filler}({counts[filler]})" for filler in self.filler_words if filler in counts]
         
         filler_rate = (filler_count / total_words) * 100 if total_words > 0 else 0
         
-        if filler_rate <= 3:
-            score = 15
-        elif filler_rate <= 6:
-            score = 12
-        elif filler_rate <= 9:
-            score = 9
-        elif filler_rate <= 12:
-            score = 6
-        else:
-            score = 3
+        score, _ = band(self.rubric['filler_words'], filler_rate)
         
         feedback = f"{filler_count} fillers ({filler_rate:.1f}%)"
         if found_fillers:
@@ -370,16 +585,7 @@ class CommunicationScorer:
         sentiment_scores = self.sentiment_analyzer.polarity_scores(text)
         positive_score = sentiment_scores['pos']  # 0 to 1
         
-        if positive_score >= 0.9:
-            score = 15
-        elif positive_score >= 0.7:
-            score = 12
-        elif positive_score >= 0.5:
-            score = 9
-        elif positive_score >= 0.3:
-            score = 6
-        else:
-            score = 3
+        score, _ = band(self.rubric['sentiment'], positive_score)
         
         # Determine sentiment category
         compound = sentiment_scores['compound']
@@ -394,9 +600,16 @@ class CommunicationScorer:
     
     # ===== AI FEEDBACK =====
     
-    def get_ai_feedback(self, transcript, overall_score, criteria_details):
+    def get_ai_feedback(self, transcript, overall_score, criteria_details, priority='interactive'):
         """Use Groq API for overall intelligent feedback"""
-        prompt = f"""You are evaluating a student's self-introduction transcript. Provide brief, constructive feedback (3-4 sentences).
+        try:
+            return self.request_ai_feedback(transcript, overall_score, criteria_details, priority=priority)
+        except Exception as e:
+            return self.fallback_feedback(overall_score)
+    
+    def build_feedback_prompt(self, transcript, overall_score, criteria_details):
+        """Build the Groq prompt for overall feedback"""
+        return f"""You are evaluating a student's self-introduction transcript. Provide brief, constructive feedback (3-4 sentences).
 
 Transcript: "{transcript}"
 
@@ -410,26 +623,153 @@ Key areas evaluated:
 - Engagement: {criteria_details.get('engagement', 'N/A')}
 
 Provide encouraging, specific, and actionable feedback."""
-
+    
+    def submit_ai_feedback(self, transcript, overall_score, criteria_details, timeout=None, priority='interactive'):
+        """Queue a feedback request on the rate-limited scheduler; returns a Future"""
+        prompt = self.build_feedback_prompt(transcript, overall_score, criteria_details)
+        return self.feedback_scheduler.submit(prompt, priority, max_tokens=FEEDBACK_MAX_TOKENS, timeout=timeout)
+    
+    def request_ai_feedback(self, transcript, overall_score, criteria_details, timeout=None, priority='interactive'):
+        """Get feedback through the scheduler (raises on API errors or timeout)"""
+        return self.submit_ai_feedback(transcript, overall_score, criteria_details, timeout, priority).result()
+    
+    def send_feedback_prompt(self, prompt, max_tokens, timeout=None):
+        """One Groq call (the scheduler's backend); returns (text, total tokens used)"""
+        chat_completion = self.groq_client.chat.completions.create(
+            messages=[{"role": "user", "content": prompt}],
+            model=FEEDBACK_MODEL,
+            temperature=0 if self.deterministic else 0.7,
+            max_tokens=max_tokens,
+            timeout=timeout,
+        )
+        usage = getattr(chat_completion, 'usage', None)
+        return chat_completion.choices[0].message.content.strip(), getattr(usage, 'total_tokens', None)
+    
+    def fallback_feedback(self, overall_score):
+        """Canned feedback used when the Groq call fails or is skipped"""
+        return f"Great effort on your self-introduction! Your score of {overall_score}/100 shows promise. Focus on the areas highlighted in the detailed breakdown to improve further."
+    
+    @staticmethod
+    def load_feedback_cache(path):
+        """Read a feedback cache: JSONL {"key", "feedback"} records (or a legacy {key: feedback} JSON object)"""
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            text = f.read()
         try:
-            chat_completion = self.groq_client.chat.completions.create(
-                messages=[{"role": "user", "content": prompt}],
-                model="llama-3.1-8b-instant",
-                temperature=0.7,
-                max_tokens=200,
-            )
-            return chat_completion.choices[0].message.content.strip()
+            data = json.loads(text)
+            if isinstance(data, dict) and 'key' not in data:
+                return data
+        except ValueError:
+            pass
+        cache = {}
+        for line in text.splitlines():
+            if line.strip():
+                record = json.loads(line)
+                cache[record['key']] = record['feedback']
+        return cache
+    
+    def deterministic_feedback(self, transcript, overall_score, criteria_details, priority='interactive'):
+        """Feedback for deterministic mode: cached by prompt hash, or the canned message"""
+        if self.feedback_cache is None:
+            return self.fallback_feedback(overall_score)
+        
+        prompt = self.build_feedback_prompt(transcript, overall_score, criteria_details)
+        key = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+        with self._feedback_cache_lock:
+            if key in self.feedback_cache:
+                return self.feedback_cache[key]
+        
+        try:
+            feedback = self.request_ai_feedback(transcript, overall_score, criteria_details, priority=priority)
         except Exception as e:
-            return f"Great effort on your self-introduction! Your score of {overall_score}/100 shows promise. Focus on the areas highlighted in the detailed breakdown to improve further."
+            # Not cached, so the next run retries this prompt
+            print(f"⚠️ AI feedback failed ({e}), using canned feedback")
+            return self.fallback_feedback(overall_score)
+        
+        with self._feedback_cache_lock:
+            self.feedback_cache[key] = feedback
+            # Append-only, so a corpus run costs one line per miss rather than a full rewrite
+            with open(self.feedback_cache_path, 'a') as f:
+                f.write(json.dumps({'key': key, 'feedback': feedback}) + '\n')
+        return feedback
+    
+    # ===== STAGE DEADLINES =====
+    
+    def _submit_stage(self, name, fn, *args):
+        """Start an optional stage on its executor; None while its circuit is open"""
+        with self._stuck_lock:
+            if len(self._stuck_stage_calls[name]) >= STAGE_WORKERS[name]:
+                return None
+        return self.stage_executors[name].submit(fn, *args), time.monotonic()
+    
+    def _mark_stuck(self, name, future):
+        """Track a timed-out call that is still running until it returns"""
+        with self._stuck_lock:
+            self._stuck_stage_calls[name].add(future)
+        
+        def release(done):
+            with self._stuck_lock:
+                self._stuck_stage_calls[name].discard(done)
+        future.add_done_callback(release)
+    
+    def _await_stage(self, name, submitted, deadline, degraded_stages, fallback):
+        """Wait for a stage within its budget; returns None if it was degraded"""
+        if submitted is None:
+            degraded_stages.append({'stage': name, 'reason': 'circuit open (earlier calls still stuck)',
+                                    'fallback': fallback})
+            return None
+        future, started = submitted
+        if self.deterministic:
+            # No time-based degradation: results must not depend on load
+            return future.result()
+        
+        stage_deadline = min(started + self.stage_budgets[name], deadline)
+        try:
+            return future.result(timeout=max(stage_deadline - time.monotonic(), 0))
+        except StageTimeout:
+            if not future.cancel() and name in self._stuck_stage_calls:
+                self._mark_stuck(name, future)
+            reason = 'timeout'
+        except Exception as e:
+            reason = f'error: {e}'
+        degraded_stages.append({'stage': name, 'reason': reason, 'fallback': fallback})
+        return None
     
     # ===== MAIN SCORING FUNCTION =====
     
-    def score_transcript(self, transcript, duration_seconds=None):
-        """Main scoring function following Nirmaan rubric"""
+    def score_transcript(self, transcript, duration_seconds=None, deadline_seconds=None,
+                         feedback_priority='interactive'):
+        """Main scoring function following Nirmaan rubric
+        
+        feedback_priority is 'interactive' or 'batch' (batch requests wait behind interactive ones).
+        Raises ValueError if nothing is left to score after normalization (e.g. only "[inaudible]").
+        """
+        if deadline_seconds is None:
+            deadline_seconds = self.deadline_seconds
+        deadline = time.monotonic() + deadline_seconds
+        degraded_stages = []
+        
+        # Normalize once; the scan (normalized text, tokens, sentences, phrase matches)
+        # is shared by every scorer and also yields the highlight spans
+        scan = self.scan_text(transcript)
+        text = scan.source
+        if not scan.words:
+            raise ValueError("Transcript has no words to score after normalization "
+                             "(only ASR event tags such as [inaudible] or (laughs)?)")
+        
+        # Start the slow optional stages first so they overlap with the rule-based ones
+        sem_job = self._submit_stage('semantic_similarity', self.semantic_similarities, text, scan)
+        gram_job = None
+        use_language_tool = self.grammar_backend != 'basic' and self.grammar_tool is not None
+        if use_language_tool:
+            gram_job = self._submit_stage('grammar', self.count_grammar_errors, text)
+        elif self.grammar_backend == 'auto':
+            degraded_stages.append({'stage': 'grammar', 'reason': 'LanguageTool unavailable', 'fallback': 'basic'})
         
         # Calculate basic metrics
-        word_count = self.count_words(transcript)
-        sentence_count = self.count_sentences(transcript)
+        word_count = len(scan.words)
+        sentence_count = scan.sentence_count
         
         # If duration not provided, estimate (average 150 WPM)
         if duration_seconds is None:
@@ -438,10 +778,18 @@ Provide encouraging, specific, and actionable feedback."""
         criteria_results = []
         
         # 1. CONTENT & STRUCTURE (40 points + 10 semantic bonus = 50 total)
-        sal_score, sal_feedback = self.score_salutation(transcript)
-        kw_score, kw_feedback, kw_found = self.score_keyword_presence(transcript)
-        flow_score, flow_feedback = self.score_flow(transcript)
-        sem_score, sem_feedback, avg_sim, max_sim = self.score_semantic_similarity(transcript)
+        sal_tier = self.salutation_tier(scan)
+        sal_score, sal_feedback = self.band_salutation(sal_tier)
+        kw_score, kw_feedback, kw_found = self.score_keyword_presence(text, scan)
+        flow_markers = self.flow_markers(scan, mark=sentence_count >= self.rubric['flow']['min_sentences'])
+        flow_score, flow_feedback = self.band_flow(sentence_count, flow_markers)
+        
+        similarities = self._await_stage('semantic_similarity', sem_job, deadline, degraded_stages, 'skipped')
+        if similarities is not None:
+            sem_score, sem_feedback, avg_sim, max_sim = self.band_semantic_similarity(similarities)
+        else:
+            # Bonus is dropped from both the score and the maximum (see normalization below)
+            sem_score, sem_feedback, avg_sim, max_sim = 0, "Skipped (over time budget or unavailable)", 0.0, 0.0
         
         content_structure_score = sal_score + kw_score + flow_score + sem_score
         
@@ -459,7 +807,7 @@ Provide encouraging, specific, and actionable feedback."""
         })
         
         # 2. SPEECH RATE (10 points)
-        sr_score, sr_feedback = self.score_speech_rate(transcript, duration_seconds)
+        sr_score, sr_feedback = self.score_speech_rate(text, duration_seconds, scan)
         
         criteria_results.append({
             'criterion': 'Speech Rate',
@@ -470,8 +818,20 @@ Provide encouraging, specific, and actionable feedback."""
         })
         
         # 3. LANGUAGE & GRAMMAR (20 points)
-        gram_score, gram_feedback, gram_ratio = self.score_grammar(transcript)
-        vocab_score, vocab_feedback, ttr = self.score_vocabulary_richness(transcript)
+        gram_errors = None
+        gram_backend_used = 'languagetool'
+        if use_language_tool:
+            gram_errors = self._await_stage('grammar', gram_job, deadline, degraded_stages, 'basic')
+        if gram_errors is None:
+            gram_errors = self.count_basic_grammar_issues(text, scan)
+            gram_backend_used = 'basic'
+        gram_score, errors_per_100_words, gram_ratio = self.band_grammar(gram_errors, word_count)
+        if gram_backend_used == 'basic':
+            gram_feedback = f"Basic check: {gram_errors} issues found"
+        else:
+            gram_feedback = f"{gram_errors} errors ({errors_per_100_words:.1f} per 100 words)"
+        vocab = self.vocabulary_features(text, scan)
+        vocab_score, vocab_feedback = self.band_vocabulary(vocab)
         
         language_grammar_score = gram_score + vocab_score
         
@@ -487,7 +847,7 @@ Provide encouraging, specific, and actionable feedback."""
         })
         
         # 4. CLARITY (15 points)
-        filler_score, filler_feedback, filler_rate = self.score_filler_words(transcript)
+        filler_score, filler_feedback, filler_rate = self.score_filler_words(text, scan)
         
         criteria_results.append({
             'criterion': 'Clarity',
@@ -498,7 +858,7 @@ Provide encouraging, specific, and actionable feedback."""
         })
         
         # 5. ENGAGEMENT (15 points)
-        sent_score, sent_feedback, pos_score = self.score_sentiment(transcript)
+        sent_score, sent_feedback, pos_score = self.score_sentiment(text)
         
         criteria_results.append({
             'criterion': 'Engagement',
@@ -512,8 +872,8 @@ Provide encouraging, specific, and actionable feedback."""
         total_score = (content_structure_score + sr_score + language_grammar_score + 
                       filler_score + sent_score)
         
-        # Normalize to 100 (since max is now 110)
-        max_possible = 110
+        # Normalize to 100 (since max is now 110, or 100 if the semantic bonus was skipped)
+        max_possible = 110 if similarities is not None else 100
         normalized_score = (total_score / max_possible) * 100
         
         # Get AI feedback
@@ -525,7 +885,50 @@ Provide encouraging, specific, and actionable feedback."""
             'engagement': sent_feedback
         }
         
-        ai_feedback = self.get_ai_feedback(transcript, normalized_score, criteria_summary)
+        remaining = deadline - time.monotonic()
+        if self.deterministic:
+            ai_feedback = self.deterministic_feedback(text, normalized_score, criteria_summary, feedback_priority)
+        elif remaining > 0:
+            # Queued on the rate limiter; a timeout cancels it before it spends quota
+            ai_job = (self.submit_ai_feedback(text, normalized_score, criteria_summary,
+                                              min(self.stage_budgets['ai_feedback'], remaining), feedback_priority),
+                      time.monotonic())
+            ai_feedback = self._await_stage('ai_feedback', ai_job, deadline, degraded_stages, 'canned')
+        else:
+            ai_feedback = None
+            degraded_stages.append({'stage': 'ai_feedback', 'reason': 'deadline exhausted', 'fallback': 'canned'})
+        if ai_feedback is None:
+            ai_feedback = self.fallback_feedback(normalized_score)
+        
+        # Raw features behind every banded score (see calibrate.py)
+        features = {
+            'word_count': int(word_count),
+            'sentence_count': int(sentence_count),
+            'duration_seconds': float(duration_seconds),
+            'wpm': float((word_count / duration_seconds) * 60),
+            'salutation_tier': sal_tier,
+            'keyword_hits': {
+                'must_have': {category: category in kw_found for category in self.must_have_keywords},
+                'good_to_have': {category: category in kw_found for category in self.good_to_have_keywords}
+            },
+            'flow_has_salutation': flow_markers[0],
+            'flow_has_early_basics': flow_markers[1],
+            'flow_has_closing': flow_markers[2],
+            'semantic_ran': similarities is not None,
+            'similarities': [float(x) for x in similarities] if similarities is not None else None,
+            'avg_similarity': float(avg_sim),
+            'max_similarity': float(max_sim),
+            'grammar_backend': gram_backend_used,
+            'grammar_errors': int(gram_errors),
+            'grammar_ratio': float(gram_ratio),
+            'ttr': float(vocab['ttr']),
+            'token_ttr': float(vocab['token_ttr']),
+            'mattr': float(vocab['mattr']),
+            'mtld': float(vocab['mtld']),
+            'hapax_ratio': float(vocab['hapax_ratio']),
+            'filler_rate': float(filler_rate),
+            'vader_pos': float(pos_score)
+        }
         
         return {
             'overall_score': float(round(normalized_score, 2)),
@@ -538,5 +941,14 @@ Provide encouraging, specific, and actionable feedback."""
             'semantic_analysis': {
                 'avg_similarity': float(round(avg_sim, 3)),
                 'max_similarity': float(round(max_sim, 3))
-            }
+            },
+            'degraded_stages': degraded_stages,
+            'engine': {
+                'deterministic': self.deterministic,
+                'grammar_backend': self.grammar_backend,
+                'semantic_pooling': self.semantic_pooling
+            },
+            'features': features,
+            'normalized_transcript': text,
+            'match_spans': self.export_spans(scan)
         }
\ No newline at end of file
@@ -0,0 +1,141 @@
+"""Length-robust vocabulary statistics
+
+Plain TTR falls as transcripts get longer, so it is complemented with:
+- MATTR: mean TTR over a rolling window of `window` tokens (TTR if the text is shorter)
+- MTLD:  mean length of token runs that keep TTR above 0.72 (forward/backward average)
+- hapax ratio: share of types used exactly once
+
+Tokens are lower-cased Unicode words with punctuation stripped ("family." ==
+"family"; "café", "मेरा" stay whole), interned to ints for the rolling window.
+"""
+import re
+import sys
+import unicodedata
+from array import array
+from collections import deque
+
+
+def _combining_marks():
+    """re character-class body for every combining mark (re has no \\p{M}; Devanagari vowel signs are marks)"""
+    ranges = []
+    start = None
+    for cp in range(sys.maxunicode + 2):
+        is_mark = cp <= sys.maxunicode and unicodedata.category(chr(cp)).startswith('M')
+        if is_mark and start is None:
+            start = cp
+        elif not is_mark and start is not None:
+            ranges.append(re.escape(chr(start)) + ('-' + re.escape(chr(cp - 1)) if cp - 1 > start else ''))
+            start = None
+    return ''.join(ranges)
+
+
+_WORD = rf"[^\W_](?:[^\W_]|[{_combining_marks()}])*"
+WORD_PATTERN = re.compile(rf"{_WORD}(?:['-]{_WORD})*")
+
+DEFAULT_WINDOW = 50
+MTLD_THRESHOLD = 0.72
+
+
+def iter_tokens(text):
+    """Lower-cased, punctuation-stripped word tokens (lazily)"""
+    for match in WORD_PATTERN.finditer(text.lower()):
+        yield match.group()
+
+
+def _mtld_factors(ids, threshold=MTLD_THRESHOLD):
+    """MTLD factor count over an id sequence (one direction)"""
+    factors = 0.0
+    seen = set()
+    length = 0
+    for token_id in ids:
+        seen.add(token_id)
+        length += 1
+        if len(seen) / length <= threshold:
+            factors += 1
+            seen = set()
+            length = 0
+    if length:
+        factors += (1 - len(seen) / length) / (1 - threshold)
+    return factors
+
+
+def _mtld(n_tokens, factors):
+    return n_tokens / factors if factors > 0 else float(n_tokens)
+
+
+class VocabularyStats:
+    """Streaming accumulator: feed tokens with update(), read measures from result()"""
+
+    def __init__(self, window=DEFAULT_WINDOW):
+        self.window = window
+        self.vocabulary = {}  # token -> id
+        self.ids = array('i')
+        self.counts = {}
+
+        self._window_ids = deque()
+        self._window_counts = {}
+        self._window_ttr_sum = 0.0
+        self._window_steps = 0
+
+        # Forward MTLD segment
+        self._mtld_factors = 0.0
+        self._mtld_seen = set()
+        self._mtld_length = 0
+
+    def update(self, token):
+        token_id = self.vocabulary.setdefault(token, len(self.vocabulary))
+        self.ids.append(token_id)
+        self.counts[token_id] = self.counts.get(token_id, 0) + 1
+
+        # Rolling window for MATTR
+        self._window_ids.append(token_id)
+        self._window_counts[token_id] = self._window_counts.get(token_id, 0) + 1
+        if len(self._window_ids) > self.window:
+            old = self._window_ids.popleft()
+            self._window_counts[old] -= 1
+            if not self._window_counts[old]:
+                del self._window_counts[old]
+        if len(self._window_ids) == self.window:
+            self._window_ttr_sum += len(self._window_counts) / self.window
+            self._window_steps += 1
+
+        # Forward MTLD
+        self._mtld_seen.add(token_id)
+        self._mtld_length += 1
+        if len(self._mtld_seen) / self._mtld_length <= MTLD_THRESHOLD:
+            self._mtld_factors += 1
+            self._mtld_seen = set()
+            self._mtld_length = 0
+
+    def result(self):
+        n_tokens = len(self.ids)
+        n_types = len(self.counts)
+        if not n_tokens:
+            return {'tokens': 0, 'types': 0, 'ttr': 0.0, 'mattr': 0.0, 'mtld': 0.0, 'hapax_ratio': 0.0}
+
+        ttr = n_types / n_tokens
+        mattr = self._window_ttr_sum / self._window_steps if self._window_steps else ttr
+
+        forward = self._mtld_factors
+        if self._mtld_length:
+            forward += (1 - len(self._mtld_seen) / self._mtld_length) / (1 - MTLD_THRESHOLD)
+        backward = _mtld_factors(reversed(self.ids))
+        mtld = (_mtld(n_tokens, forward) + _mtld(n_tokens, backward)) / 2
+
+        hapax = sum(1 for count in self.counts.values() if count == 1)
+        return {
+            'tokens': n_tokens,
+            'types': n_types,
+            'ttr': ttr,
+            'mattr': mattr,
+            'mtld': mtld,
+            'hapax_ratio': hapax / n_types
+        }
+
+
+def vocabulary_stats(text, window=DEFAULT_WINDOW):
+    """All vocabulary measures for one text in a single streaming pass"""
+    stats = VocabularyStats(window)
+    for token in iter_tokens(text):
+        stats.update(token)
+    return stats.result()